@@ -5,33 +5,44 @@ Minimal FastAPI backend (cleaned) for Talking Pet MVP.
 """
 
 import asyncio
+import base64
+import hashlib
+import hmac
 import ipaddress
 import json
 import logging
 import os
+import re
 import secrets
 import importlib
+import importlib.util
 import shutil
 import socket
 import subprocess
 import tempfile
 import time
 import uuid
+from collections import OrderedDict
+from contextlib import asynccontextmanager, nullcontext, suppress
 from http import HTTPStatus
-from functools import lru_cache
+from functools import lru_cache, partial
 from datetime import datetime, timedelta, timezone
 from enum import Enum
-from typing import Any, ClassVar, Literal, Tuple
+from email.utils import parsedate_to_datetime
+from typing import Any, AsyncIterator, Awaitable, Callable, ClassVar, Literal, Tuple
 from urllib.parse import urljoin, urlparse
 
 import httpx
-from fastapi import Depends, FastAPI, HTTPException, Request
+import orjson
+from fastapi import Depends, FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, Field
 
 try:  # Pydantic v2
-    from pydantic import ConfigDict
+    from pydantic import ConfigDict, model_validator
 except ImportError:  # Pydantic v1
+    from pydantic import root_validator
+
     ConfigDict = None
 
 from model_registry import (
@@ -75,8 +86,30 @@ API_AUTH_ENABLED = os.getenv("API_AUTH_ENABLED", "false").strip().lower() in {
 API_AUTH_TOKEN = os.getenv("API_AUTH_TOKEN", "")
 
 # TTS tuning
+# Audio is stored and muxed as MP3 and re-encoded to AAC in the final MP4, so
+# keep this in the ``mp3_*`` family. Lower bitrates (e.g. ``mp3_22050_32``)
+# roughly halve TTS/Supabase/mux bytes at an audible cost in voice clarity.
 TTS_OUTPUT_FORMAT = os.getenv("TTS_OUTPUT_FORMAT", "mp3_44100_64")
 TTS_MAX_CHARS = int(os.getenv("TTS_MAX_CHARS", "600"))
+TTS_MODEL_ID = "eleven_multilingual_v2"
+TTS_CACHE_ENABLED = os.getenv("TTS_CACHE_ENABLED", "false").lower() in {
+    "1",
+    "true",
+    "yes",
+    "on",
+}
+PET_VIDEO_INSERT_BATCHING = os.getenv("PET_VIDEO_INSERT_BATCHING", "false").lower() in {
+    "1",
+    "true",
+    "yes",
+    "on",
+}
+PET_VIDEO_INSERT_BATCH_SIZE = int(os.getenv("PET_VIDEO_INSERT_BATCH_SIZE", "50"))
+PET_VIDEO_INSERT_FLUSH_SEC = float(os.getenv("PET_VIDEO_INSERT_FLUSH_SEC", "0.5"))
+PET_VIDEO_INSERT_QUEUE_MAX = int(os.getenv("PET_VIDEO_INSERT_QUEUE_MAX", "1000"))
+# Scratch space for ffmpeg/ffprobe intermediates; point at a tmpfs (e.g. /dev/shm)
+# to keep them in RAM. Unset uses the platform temp dir.
+MEDIA_TMP_DIR = os.getenv("MEDIA_TMP_DIR") or None
 VIDEO_UPLOAD_TARGET_BYTES = int(os.getenv("VIDEO_UPLOAD_TARGET_BYTES", "9500000"))
 IDEMPOTENCY_POLL_INTERVAL_SEC = float(os.getenv("IDEMPOTENCY_POLL_INTERVAL_SEC", "1"))
 IDEMPOTENCY_MAX_WAIT_SEC = float(os.getenv("IDEMPOTENCY_MAX_WAIT_SEC", "900"))
@@ -88,8 +121,29 @@ ENABLE_FINAL_VIDEO_DEBUG = os.getenv("ENABLE_FINAL_VIDEO_DEBUG", "true").lower()
 }
 REPLICATE_POLL_INTERVAL_SEC = float(os.getenv("REPLICATE_POLL_INTERVAL_SEC", "2"))
 REPLICATE_POLL_TIMEOUT_SEC = float(os.getenv("REPLICATE_POLL_TIMEOUT_SEC", "900"))
+REPLICATE_POLL_MAX_INTERVAL_SEC = float(
+    os.getenv("REPLICATE_POLL_MAX_INTERVAL_SEC", "10")
+)
+REPLICATE_POLL_BACKOFF_FACTOR = 1.5
+PUBLIC_CALLBACK_BASE = os.getenv("PUBLIC_CALLBACK_BASE", "").rstrip("/")
+# Replicate deletes API prediction outputs after an hour; keep this well below.
+REPLICATE_OUTPUT_CACHE_TTL_SEC = float(os.getenv("REPLICATE_OUTPUT_CACHE_TTL_SEC", "0"))
+REPLICATE_OUTPUT_CACHE_MAX_ENTRIES = int(
+    os.getenv("REPLICATE_OUTPUT_CACHE_MAX_ENTRIES", "256")
+)
+REPLICATE_WEBHOOK_SECRET = os.getenv("REPLICATE_WEBHOOK_SECRET", "")
+REPLICATE_WEBHOOK_TOLERANCE_SEC = 300
+REPLICATE_WEBHOOK_FALLBACK_POLL_SEC = float(
+    os.getenv("REPLICATE_WEBHOOK_FALLBACK_POLL_SEC", "30")
+)
 FETCH_MAX_BYTES = int(os.getenv("FETCH_MAX_BYTES", "52428800"))
 DEBUG_FETCH_MAX_BYTES = int(os.getenv("DEBUG_FETCH_MAX_BYTES", "15728640"))
+FETCH_CHUNK_BYTES = 1 << 20
+SUPABASE_RESUMABLE_THRESHOLD_BYTES = int(
+    os.getenv("SUPABASE_RESUMABLE_THRESHOLD_BYTES", str(20 * 1024 * 1024))
+)
+# Supabase's TUS endpoint requires every part except the last to be exactly 6MB.
+SUPABASE_TUS_CHUNK_BYTES = 6 * 1024 * 1024
 MAX_REDIRECT_HOPS = int(os.getenv("MAX_REDIRECT_HOPS", "5"))
 ASYNC_JOB_POLL_INTERVAL_SEC = float(os.getenv("ASYNC_JOB_POLL_INTERVAL_SEC", "5"))
 ASYNC_JOB_MAX_ATTEMPTS = int(os.getenv("ASYNC_JOB_MAX_ATTEMPTS", "3"))
@@ -101,12 +155,225 @@ ALLOW_PRIVATE_URL_FETCHES = os.getenv("ALLOW_PRIVATE_URL_FETCHES", "false").lowe
     "yes",
     "on",
 }
+HEAD_INFO_CACHE_TTL_SEC = float(os.getenv("HEAD_INFO_CACHE_TTL_SEC", "300"))
+HEAD_INFO_CACHE_MAX_ENTRIES = int(os.getenv("HEAD_INFO_CACHE_MAX_ENTRIES", "1024"))
+JSON_CONTENT_HEADERS = {"Content-Type": "application/json"}
+SUPABASE_MINIMAL_WRITE_HEADERS = {
+    "Content-Type": "application/json",
+    "Prefer": "return=minimal",
+}
+ELEVEN_TTS_URL = "https://api.elevenlabs.io/v1/text-to-speech/{voice_id}"
+REPLICATE_API_BASE = "https://api.replicate.com/v1"
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+HTTP_KEEPALIVE_EXPIRY_SEC = float(os.getenv("HTTP_KEEPALIVE_EXPIRY_SEC", "30"))
+REPLICATE_CONCURRENCY = int(os.getenv("REPLICATE_CONCURRENCY", "8"))
+REPLICATE_MAX_ACTIVE_PREDICTIONS = int(
+    os.getenv("REPLICATE_MAX_ACTIVE_PREDICTIONS", "0")
+)
+ELEVEN_CONCURRENCY = int(os.getenv("ELEVEN_CONCURRENCY", "4"))
+SUPABASE_CONCURRENCY = int(os.getenv("SUPABASE_CONCURRENCY", "16"))
+UPSTREAM_RETRY_ATTEMPTS = int(os.getenv("UPSTREAM_RETRY_ATTEMPTS", "3"))
+UPSTREAM_RETRY_MAX_DELAY_SEC = float(os.getenv("UPSTREAM_RETRY_MAX_DELAY_SEC", "30"))
+UPSTREAM_RETRY_BASE_DELAY_SEC = 1.0
+RETRYABLE_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+# HTTP/2 needs the optional ``h2`` package (``httpx[http2]``); fall back to
+# HTTP/1.1 when it is missing rather than failing client construction.
+HTTP2_ENABLED = (
+    os.getenv("HTTP2_ENABLED", "true").lower() in {"1", "true", "yes", "on"}
+    and importlib.util.find_spec("h2") is not None
+)
 
 PUBLIC_BASE = f"{SUPABASE_URL}/storage/v1/object/public"
 UPLOAD_BASE = f"{SUPABASE_URL}/storage/v1/object"
 
+# ===== HTTP clients =====
+# One pooled client per upstream so long Replicate polls never hold connections
+# that short Supabase/ElevenLabs requests need. Auth headers are set once here.
+# Client defaults come from HTTP_TIMEOUTS; the remaining keys are per-call
+# overrides for requests that need a different budget on a shared client.
+HTTP_TIMEOUTS: dict[str, httpx.Timeout] = {
+    "elevenlabs": httpx.Timeout(120.0, connect=10.0),
+    "supabase": httpx.Timeout(30.0, connect=10.0),
+    "supabase_upload": httpx.Timeout(120.0, connect=10.0),
+    "replicate": httpx.Timeout(600.0, connect=10.0, write=60.0, pool=5.0),
+    "default": httpx.Timeout(120.0, connect=10.0),
+    "probe": httpx.Timeout(30.0, connect=10.0),
+}
+_http_clients: dict[str, httpx.AsyncClient] = {}
+
+
+def _build_http_client(upstream: str) -> httpx.AsyncClient:
+    limits = httpx.Limits(
+        max_connections=HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY_SEC,
+    )
+    if upstream == "elevenlabs":
+        return httpx.AsyncClient(
+            headers={"xi-api-key": ELEVEN_API_KEY},
+            timeout=HTTP_TIMEOUTS["elevenlabs"],
+            limits=httpx.Limits(
+                max_keepalive_connections=8, keepalive_expiry=HTTP_KEEPALIVE_EXPIRY_SEC
+            ),
+            http2=HTTP2_ENABLED,
+        )
+    if upstream == "supabase":
+        return httpx.AsyncClient(
+            headers={
+                "Authorization": f"Bearer {SUPABASE_SERVICE_ROLE}",
+                "apikey": SUPABASE_SERVICE_ROLE,
+            },
+            timeout=HTTP_TIMEOUTS["supabase"],
+            limits=limits,
+            http2=HTTP2_ENABLED,
+        )
+    if upstream == "replicate":
+        return httpx.AsyncClient(
+            headers={"Authorization": f"Token {REPLICATE_API_TOKEN}"},
+            timeout=HTTP_TIMEOUTS["replicate"],
+            limits=limits,
+            http2=HTTP2_ENABLED,
+        )
+    if upstream == "default":
+        return httpx.AsyncClient(
+            timeout=HTTP_TIMEOUTS["default"],
+            limits=limits,
+            http2=HTTP2_ENABLED,
+        )
+    raise ValueError(f"Unknown HTTP upstream: {upstream}")
+
+
+def get_http_client(upstream: str = "default") -> httpx.AsyncClient:
+    """Return the pooled AsyncClient for an upstream service.
+
+    ``default`` is used for user-supplied media URLs and carries no credentials.
+    """
+
+    client = _http_clients.get(upstream)
+    if client is None or client.is_closed:
+        client = _build_http_client(upstream)
+        _http_clients[upstream] = client
+    return client
+
+
+async def close_http_clients() -> None:
+    """Close every pooled AsyncClient created so far."""
+
+    clients = list(_http_clients.values())
+    _http_clients.clear()
+    for client in clients:
+        await client.aclose()
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    """Run startup checks and own the pooled HTTP clients for the app lifetime."""
+
+    run_ffmpeg_runtime_smoke_check()
+    flusher = start_pet_video_insert_flusher() if PET_VIDEO_INSERT_BATCHING else None
+    try:
+        yield
+    finally:
+        if flusher is not None:
+            await stop_pet_video_insert_flusher(flusher)
+        await close_http_clients()
+
+
+# Cap in-flight calls per rate-limited upstream so a traffic spike queues here
+# instead of tripping provider limits and cascading into retries.
+REPLICATE_SEM = asyncio.Semaphore(REPLICATE_CONCURRENCY)
+ELEVEN_SEM = asyncio.Semaphore(ELEVEN_CONCURRENCY)
+# Applied per request rather than through pool limits: HTTP/2 multiplexes many
+# requests over one connection, and long Storage uploads would otherwise starve
+# short REST calls into pool timeouts on HTTP/1.1.
+SUPABASE_SEM = asyncio.Semaphore(SUPABASE_CONCURRENCY)
+# Optional cap on renders running at once (create through final poll), which
+# bounds provider spend; REPLICATE_SEM only bounds individual API calls.
+REPLICATE_PREDICTION_SEM = (
+    asyncio.Semaphore(REPLICATE_MAX_ACTIVE_PREDICTIONS)
+    if REPLICATE_MAX_ACTIVE_PREDICTIONS > 0
+    else None
+)
+
+
+def retry_after_seconds(response: httpx.Response) -> float | None:
+    """Parse a ``Retry-After`` header (seconds or HTTP date) into seconds."""
+
+    retry_after = response.headers.get("Retry-After")
+    if not retry_after:
+        return None
+    try:
+        return max(float(retry_after), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(retry_after)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+def _retry_delay_seconds(response: httpx.Response, attempt: int) -> float:
+    """Seconds to wait before retrying, honouring ``Retry-After`` when present."""
+
+    delay = retry_after_seconds(response)
+    if delay is None:
+        delay = UPSTREAM_RETRY_BASE_DELAY_SEC * (2**attempt)
+    return min(delay, UPSTREAM_RETRY_MAX_DELAY_SEC)
+
+
+def _is_retryable(response: httpx.Response, idempotent: bool) -> bool:
+    if idempotent:
+        return response.status_code in RETRYABLE_STATUS_CODES
+    # A 5xx on a create may arrive after the upstream accepted the request, so
+    # retrying could bill a duplicate render/synthesis or open a second upload.
+    # Only retry when the upstream says it did not process the request.
+    if response.status_code == 503:
+        return "Retry-After" in response.headers
+    return response.status_code == 429
+
+
+async def send_with_retry(
+    send: Callable[[], Awaitable[httpx.Response]],
+    semaphore: asyncio.Semaphore | None = None,
+    *,
+    idempotent: bool = True,
+) -> httpx.Response:
+    """Send an upstream request, retrying 429/5xx responses.
+
+    ``send`` is called once per attempt, under ``semaphore`` when given; the
+    semaphore is released while waiting between attempts. Pass
+    ``idempotent=False`` for requests that create something upstream (POSTs):
+    those only retry 429, and 503 with ``Retry-After``. The final response is
+    returned whatever its status, so callers keep their own error handling.
+    """
+
+    attempt = 0
+    while True:
+        if semaphore is None:
+            response = await send()
+        else:
+            async with semaphore:
+                response = await send()
+        if (
+            not _is_retryable(response, idempotent)
+            or attempt >= UPSTREAM_RETRY_ATTEMPTS - 1
+        ):
+            return response
+        delay = _retry_delay_seconds(response, attempt)
+        await response.aclose()
+        logger.warning(
+            "Upstream returned %s; retrying in %.1fs", response.status_code, delay
+        )
+        await asyncio.sleep(delay)
+        attempt += 1
+
+
 # ===== App =====
-app = FastAPI(title="Talking Pet Backend (Multi-Model)")
+app = FastAPI(title="Talking Pet Backend (Multi-Model)", lifespan=lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[ALLOWED_ORIGIN] if ALLOWED_ORIGIN != "*" else ["*"],
@@ -198,16 +465,13 @@ async def get_used_credits_for_period(
     period_start = get_usage_period_start(period, now)
 
     endpoint = f"{SUPABASE_URL}/rest/v1/pet_videos"
-    headers = {
-        "Authorization": f"Bearer {SUPABASE_SERVICE_ROLE}",
-        "apikey": SUPABASE_SERVICE_ROLE,
-    }
     params = {"select": "credit_cost", "user_id": f"eq.{user_id}"}
     if period_start is not None:
         params["created_at"] = f"gte.{period_start.isoformat()}"
 
-    async with httpx.AsyncClient(timeout=30) as client:
-        response = await client.get(endpoint, headers=headers, params=params)
+    client = get_http_client("supabase")
+    async with SUPABASE_SEM:
+        response = await client.get(endpoint, params=params)
 
     if response.status_code >= 400:
         raise HTTPException(
@@ -372,32 +636,59 @@ def _validate_outbound_url(url: str, *, allow_private: bool = False) -> None:
             raise HTTPException(400, "URL host resolves to a non-public address.")
 
 
+def _apply_alias_compat_map(compat_map: dict[str, tuple[str, ...]], data: Any) -> Any:
+    """Copy legacy alias keys onto their field names before validation."""
+
+    if not compat_map or not isinstance(data, dict):
+        return data
+    patched: dict[str, Any] | None = None
+    for field_name, alias_candidates in compat_map.items():
+        if field_name in data:
+            continue
+        for alias_key in alias_candidates:
+            if alias_key in data:
+                if patched is None:
+                    patched = dict(data)
+                patched[field_name] = data[alias_key]
+                break
+    return data if patched is None else patched
+
+
 class RequestModel(BaseModel):
-    """Pydantic v1/v2-compatible request base model config."""
+    """Pydantic v1/v2-compatible request base model config.
+
+    Legacy aliases are applied in a ``before`` validator rather than a custom
+    ``__init__`` so pydantic v2 can keep validation on its compiled fast path.
+    """
 
     ALIAS_COMPAT_MAP: ClassVar[dict[str, tuple[str, ...]]] = {}
 
     if ConfigDict is not None:
         model_config = ConfigDict(populate_by_name=True, extra="ignore")
+
+        @model_validator(mode="before")
+        @classmethod
+        def _apply_alias_compat(cls, data: Any) -> Any:
+            return _apply_alias_compat_map(cls.ALIAS_COMPAT_MAP, data)
+
     else:
 
         class Config:
             allow_population_by_field_name = True
             extra = "ignore"
 
-    def __init__(self, **data: Any):
-        compat_map = getattr(self.__class__, "ALIAS_COMPAT_MAP", {}) or {}
-        for field_name, alias_candidates in compat_map.items():
-            if field_name in data:
-                continue
-            for alias_key in alias_candidates:
-                if alias_key in data:
-                    data[field_name] = data[alias_key]
-                    break
-        super().__init__(**data)
+        @root_validator(pre=True)
+        def _apply_alias_compat(cls, values: dict[str, Any]) -> dict[str, Any]:
+            return _apply_alias_compat_map(cls.ALIAS_COMPAT_MAP, values)
 
 
 # ===== Auth =====
+@lru_cache(maxsize=4)
+def _token_digest(token: str) -> bytes:
+    # Cached so the configured token is only hashed once per value.
+    return hashlib.sha256(token.encode()).digest()
+
+
 async def require_auth(request: Request) -> None:
     """Enforce bearer token authentication when enabled via configuration."""
 
@@ -418,7 +709,10 @@ async def require_auth(request: Request) -> None:
     if scheme.lower() != "bearer" or not token:
         raise HTTPException(401, "Authorization header must be 'Bearer <token>'")
 
-    if not secrets.compare_digest(token, API_AUTH_TOKEN):
+    # Comparing fixed-size digests keeps the check constant-time regardless of
+    # the presented token's length.
+    candidate = hashlib.sha256(token.encode()).digest()
+    if not hmac.compare_digest(candidate, _token_digest(API_AUTH_TOKEN)):
         raise HTTPException(403, "Invalid API token")
 
 
@@ -552,6 +846,13 @@ class HeadRequest(BaseModel):
     url: str
 
 
+class ReplicateWebhookPayload(BaseModel):
+    """Subset of the prediction object Replicate posts to ``/webhooks/replicate``."""
+
+    id: str
+    status: str | None = None
+
+
 class FinalVideoDebugRequest(BaseModel):
     """Request body for the ``/debug/final_video`` endpoint."""
 
@@ -665,6 +966,33 @@ def get_model_config(model: str) -> dict:
     return config
 
 
+# Provider resolution vocabularies, keyed by the requested resolution.
+# Kling: resolution -> (mode override or None, aspect ratio).
+_KLING_RESOLUTIONS: dict[str, tuple[str | None, str]] = {
+    "1080p": ("pro", "16:9"),
+    "1024p": (None, "16:9"),
+}
+_KLING_DEFAULT_RESOLUTION: tuple[str | None, str] = (None, "1:1")
+_SEEDANCE_RESOLUTIONS: dict[str, str] = {
+    "480p": "480p",
+    "720p": "720p",
+    "1080p": "1080p",
+    "1024p": "1080p",
+}
+_SEEDANCE_DEFAULT_RESOLUTION = "720p"
+
+
+@lru_cache(maxsize=None)
+def _model_payload_family(model: str) -> str | None:
+    """Classify a model once for the provider-specific payload rules."""
+
+    if model.startswith("kwaivgi/kling-"):
+        return "kling"
+    if model.startswith("bytedance/seedance-1-"):
+        return "seedance"
+    return None
+
+
 def build_model_payload(
     model: str,
     image_url: str,
@@ -679,28 +1007,31 @@ def build_model_payload(
 
     config = get_model_config(model)
     param_mapping = config["param_mapping"]
+    family = _model_payload_family(model)
 
-    payload = {"input": (input_params or {}).copy()}
+    # Copy only caller-supplied params (they are written to below); the model's
+    # ``default_params`` are read, never copied.
+    payload_input: dict[str, Any] = dict(input_params) if input_params else {}
 
     if "fps" in param_mapping:
         mapped_fps_key = param_mapping["fps"]
-        raw_fps = payload["input"].get("fps")
+        raw_fps = payload_input.get("fps")
         if raw_fps is not None and mapped_fps_key != "fps":
-            payload["input"].pop("fps", None)
-            payload["input"][mapped_fps_key] = raw_fps
+            payload_input.pop("fps", None)
+            payload_input[mapped_fps_key] = raw_fps
 
     if "image_url" in param_mapping:
-        payload["input"][param_mapping["image_url"]] = image_url
+        payload_input[param_mapping["image_url"]] = image_url
     if "prompt" in param_mapping:
-        payload["input"][param_mapping["prompt"]] = prompt
+        payload_input[param_mapping["prompt"]] = prompt
 
     effective_fps: int | None = None
     if "fps" in param_mapping:
         mapped_fps_key = param_mapping["fps"]
         if fps is not None:
             effective_fps = fps
-        elif isinstance(payload["input"].get(mapped_fps_key), int):
-            effective_fps = payload["input"].get(mapped_fps_key)
+        elif isinstance(payload_input.get(mapped_fps_key), int):
+            effective_fps = payload_input.get(mapped_fps_key)
         elif isinstance(config.get("default_params", {}).get(mapped_fps_key), int):
             effective_fps = config["default_params"].get(mapped_fps_key)
 
@@ -712,115 +1043,307 @@ def build_model_payload(
             frame_range = config.get("frame_count_range", {})
             min_frames = int(frame_range.get("min", 81))
             max_frames = int(frame_range.get("max", 121))
-            payload["input"][duration_key] = max(
-                min_frames, min(max_frames, frame_count)
-            )
+            payload_input[duration_key] = max(min_frames, min(max_frames, frame_count))
             if "fps" in param_mapping:
-                payload["input"][param_mapping["fps"]] = resolved_fps
-        elif model.startswith("kwaivgi/kling-"):
-            payload["input"][duration_key] = 5 if seconds <= 5 else 10
+                payload_input[param_mapping["fps"]] = resolved_fps
+        elif family == "kling":
+            payload_input[duration_key] = 5 if seconds <= 5 else 10
         else:
-            payload["input"][duration_key] = seconds
+            payload_input[duration_key] = seconds
 
     if "resolution" in param_mapping:
         mapped_resolution_key = param_mapping["resolution"]
-        if model.startswith("kwaivgi/kling-"):
-            payload["input"].setdefault("mode", "standard")
-            if resolution == "1080p":
-                payload["input"]["mode"] = "pro"
-                payload["input"][mapped_resolution_key] = "16:9"
-            elif resolution == "1024p":
-                payload["input"][mapped_resolution_key] = "16:9"
-            else:
-                payload["input"][mapped_resolution_key] = "1:1"
-        elif model.startswith("bytedance/seedance-1-"):
-            if resolution in {"480p", "720p", "1080p"}:
-                payload["input"][mapped_resolution_key] = resolution
-            elif resolution == "1024p":
-                payload["input"][mapped_resolution_key] = "1080p"
-            else:
-                payload["input"][mapped_resolution_key] = "720p"
+        if family == "kling":
+            mode, aspect_ratio = _KLING_RESOLUTIONS.get(
+                resolution, _KLING_DEFAULT_RESOLUTION
+            )
+            payload_input.setdefault("mode", "standard")
+            if mode:
+                payload_input["mode"] = mode
+            payload_input[mapped_resolution_key] = aspect_ratio
+        elif family == "seedance":
+            payload_input[mapped_resolution_key] = _SEEDANCE_RESOLUTIONS.get(
+                resolution, _SEEDANCE_DEFAULT_RESOLUTION
+            )
         else:
-            payload["input"][mapped_resolution_key] = resolution
+            payload_input[mapped_resolution_key] = resolution
 
     if "audio_url" in param_mapping and audio_url:
-        payload["input"][param_mapping["audio_url"]] = audio_url
+        payload_input[param_mapping["audio_url"]] = audio_url
     if fps is not None and "fps" in param_mapping:
-        payload["input"][param_mapping["fps"]] = fps
+        payload_input[param_mapping["fps"]] = fps
+
+    return {"input": payload_input}
 
-    return payload
 
+TTS_MAX_AUDIO_BYTES = 9_500_000
+TTS_AUDIO_TOO_LARGE_MESSAGE = (
+    "Generated audio >9.5MB. Shorten script or reduce bitrate."
+)
 
-async def elevenlabs_tts_bytes(text: str, voice_id: str) -> bytes:
-    """Generate speech with ElevenLabs and return it as raw bytes.
 
-    Args:
-        text: Script to synthesize.
-        voice_id: Identifier of the ElevenLabs voice to use.
+def validate_tts_text(text: str) -> None:
+    """Reject over-long scripts before paying for synthesis or a render.
+
+    The synthesized size itself is enforced while streaming against
+    ``TTS_MAX_AUDIO_BYTES``.
 
     Raises:
-        HTTPException: If the API key is missing, the text is too long or the
-            API responds with an error.
+        HTTPException: 400 if the text exceeds ``TTS_MAX_CHARS``.
     """
 
-    if not ELEVEN_API_KEY:
-        raise HTTPException(500, "ELEVEN_API_KEY not set")
     if len(text) > TTS_MAX_CHARS:
         raise HTTPException(
             400,
             f"Text too long (max {TTS_MAX_CHARS} chars). Please shorten.",
         )
 
-    url = f"https://api.elevenlabs.io/v1/text-to-speech/{voice_id}"
-    async with httpx.AsyncClient(timeout=120) as client:
-        r = await client.post(
-            url,
-            headers={
-                "xi-api-key": ELEVEN_API_KEY,
-                "Content-Type": "application/json",
-            },
-            json={
+
+async def _tee_stream(
+    chunks: AsyncIterator[bytes], sink: bytearray
+) -> AsyncIterator[bytes]:
+    """Pass chunks through while also collecting them into ``sink``."""
+
+    async for chunk in chunks:
+        sink += chunk
+        yield chunk
+
+
+async def _limit_stream_size(
+    chunks: AsyncIterator[bytes], max_bytes: int, message: str
+) -> AsyncIterator[bytes]:
+    """Pass chunks through, raising a 400 once ``max_bytes`` is exceeded."""
+
+    total = 0
+    async for chunk in chunks:
+        total += len(chunk)
+        if total > max_bytes:
+            raise HTTPException(400, message)
+        yield chunk
+
+
+@asynccontextmanager
+async def elevenlabs_tts_stream(
+    text: str, voice_id: str
+) -> AsyncIterator[AsyncIterator[bytes]]:
+    """Open an ElevenLabs speech stream and yield an iterator over its MP3 chunks.
+
+    The context is entered only after ElevenLabs has accepted the request, so
+    callers can start dependent work knowing synthesis is under way. Chunks can
+    be handed straight to :func:`supabase_upload` without buffering the file.
+
+    Raises:
+        HTTPException: If the API key is missing, the text is too long or the
+            audio exceeds the upload size limit.
+        httpx.HTTPStatusError: If ElevenLabs rejects the request.
+    """
+
+    if not ELEVEN_API_KEY:
+        raise HTTPException(500, "ELEVEN_API_KEY not set")
+    validate_tts_text(text)
+
+    url = ELEVEN_TTS_URL.format(voice_id=voice_id)
+    client = get_http_client("elevenlabs")
+    request = client.build_request(
+        "POST",
+        url,
+        content=orjson.dumps(
+            {
                 "text": text,
-                "model_id": "eleven_multilingual_v2",
+                "model_id": TTS_MODEL_ID,
                 "output_format": TTS_OUTPUT_FORMAT,
-            },
+            }
+        ),
+        headers=JSON_CONTENT_HEADERS,
+    )
+    # ElevenLabs counts a request as concurrent until its audio finishes
+    # streaming, so the slot is held for the whole body, not just the headers.
+    async with ELEVEN_SEM:
+        r = await send_with_retry(
+            lambda: client.send(request, stream=True), idempotent=False
         )
-        r.raise_for_status()
-        audio = r.content
-        if len(audio) > 9_500_000:
-            raise HTTPException(
-                400,
-                "Generated audio >9.5MB. Shorten script or reduce bitrate.",
+        try:
+            r.raise_for_status()
+            # Reject a declared oversize body before any of it reaches an upload.
+            declared = r.headers.get("Content-Length")
+            if (
+                declared
+                and declared.isdigit()
+                and "Content-Encoding" not in r.headers
+                and int(declared) > TTS_MAX_AUDIO_BYTES
+            ):
+                raise HTTPException(400, TTS_AUDIO_TOO_LARGE_MESSAGE)
+            yield _limit_stream_size(
+                r.aiter_bytes(), TTS_MAX_AUDIO_BYTES, TTS_AUDIO_TOO_LARGE_MESSAGE
             )
-        return audio
+        finally:
+            await r.aclose()
+
+
+async def elevenlabs_tts_bytes(text: str, voice_id: str) -> bytearray:
+    """Generate speech with ElevenLabs and return it as a single buffer.
+
+    Chunks are appended to one ``bytearray`` rather than joined into a fresh
+    ``bytes`` object, and :func:`supabase_upload` sends that buffer as-is.
+
+    Args:
+        text: Script to synthesize.
+        voice_id: Identifier of the ElevenLabs voice to use.
+
+    Raises:
+        HTTPException: If the API key is missing, the text is too long or the
+            API responds with an error.
+    """
+
+    buf = bytearray()
+    async with elevenlabs_tts_stream(text, voice_id) as chunks:
+        async for chunk in chunks:
+            buf += chunk
+    return buf
+
+
+async def _single_chunk(data: bytearray | memoryview) -> AsyncIterator[bytes]:
+    yield data
 
 
 async def supabase_upload(
-    file_bytes: bytes, object_path: str, content_type: str
+    file_bytes: bytes | bytearray | memoryview | AsyncIterator[bytes],
+    object_path: str,
+    content_type: str,
 ) -> str:
-    """Upload a file to Supabase Storage and return a public URL."""
+    """Upload a file to Supabase Storage and return a public URL.
+
+    ``file_bytes`` may be an async iterator, in which case the body is sent with
+    chunked transfer encoding as chunks arrive.
+    """
 
     if not SUPABASE_URL or not SUPABASE_SERVICE_ROLE:
         raise HTTPException(500, "Supabase env not set")
+    if (
+        isinstance(file_bytes, (bytes, bytearray, memoryview))
+        and memoryview(file_bytes).nbytes > SUPABASE_RESUMABLE_THRESHOLD_BYTES
+    ):
+        await _supabase_resumable_upload(
+            memoryview(file_bytes), object_path, content_type
+        )
+        return f"{PUBLIC_BASE}/{SUPABASE_BUCKET}/{object_path}"
+
     upload_url = f"{UPLOAD_BASE}/{SUPABASE_BUCKET}/{object_path}"
     headers = {
-        "Authorization": f"Bearer {SUPABASE_SERVICE_ROLE}",
-        "apikey": SUPABASE_SERVICE_ROLE,
         "Content-Type": content_type,
     }
-    async with httpx.AsyncClient(timeout=120) as client:
+    content = file_bytes
+    if isinstance(file_bytes, (bytearray, memoryview)):
+        # httpx only takes ``bytes`` directly; mutable buffers are sent as one
+        # chunk with an explicit length so they go out without a copy.
+        headers["Content-Length"] = str(memoryview(file_bytes).nbytes)
+        content = _single_chunk(file_bytes)
+    client = get_http_client("supabase")
+    async with SUPABASE_SEM:
         r = await client.post(
             upload_url,
             headers=headers,
-            content=file_bytes,
+            content=content,
             params={"upsert": "true"},
+            timeout=HTTP_TIMEOUTS["supabase_upload"],
         )
-        if r.status_code >= 400:
-            raise HTTPException(
-                r.status_code,
-                f"Supabase upload failed: {r.text}",
-            )
-    return f"{PUBLIC_BASE}/{SUPABASE_BUCKET}/{object_path}?download=1"
+    if r.status_code >= 400:
+        raise HTTPException(
+            r.status_code,
+            f"Supabase upload failed: {r.text}",
+        )
+    # Plain public path: ``?download=1`` forces an attachment disposition and
+    # defeats CDN caching for players and providers fetching the file.
+    return f"{PUBLIC_BASE}/{SUPABASE_BUCKET}/{object_path}"
+
+
+async def _supabase_resumable_upload(
+    data: memoryview, object_path: str, content_type: str
+) -> None:
+    """Upload ``data`` through the Storage TUS endpoint in 6MB parts.
+
+    A failed or stalled part is retried from the offset the server reports,
+    so a dropped connection costs one part rather than the whole file.
+    """
+
+    client = get_http_client("supabase")
+    tus_headers = {"Tus-Resumable": "1.0.0"}
+    metadata = ",".join(
+        f"{key} {base64.b64encode(value.encode()).decode()}"
+        for key, value in (
+            ("bucketName", SUPABASE_BUCKET),
+            ("objectName", object_path),
+            ("contentType", content_type),
+        )
+    )
+    create = await send_with_retry(
+        lambda: client.post(
+            f"{SUPABASE_URL}/storage/v1/upload/resumable",
+            headers={
+                **tus_headers,
+                "Upload-Length": str(data.nbytes),
+                "Upload-Metadata": metadata,
+                "x-upsert": "true",
+            },
+        ),
+        SUPABASE_SEM,
+        idempotent=False,
+    )
+    if create.status_code >= 400:
+        raise HTTPException(
+            create.status_code, f"Supabase upload failed: {create.text}"
+        )
+    if not create.headers.get("Location"):
+        raise HTTPException(
+            502, "Supabase upload failed: resumable create returned no Location."
+        )
+    location = urljoin(str(create.url), create.headers["Location"])
+
+    offset = 0
+    failures = 0
+    while offset < data.nbytes:
+        end = min(offset + SUPABASE_TUS_CHUNK_BYTES, data.nbytes)
+        part = data[offset:end]
+        try:
+            async with SUPABASE_SEM:
+                r = await client.patch(
+                    location,
+                    headers={
+                        **tus_headers,
+                        "Upload-Offset": str(offset),
+                        "Content-Type": "application/offset+octet-stream",
+                        "Content-Length": str(part.nbytes),
+                    },
+                    content=_single_chunk(part),
+                    timeout=HTTP_TIMEOUTS["supabase_upload"],
+                )
+        except httpx.TransportError:
+            r = None
+        if r is not None and r.status_code < 300:
+            offset = int(r.headers.get("Upload-Offset", offset + part.nbytes))
+            failures = 0
+            continue
+        # 409 means our offset disagrees with the server's; resync and go on.
+        if r is not None and r.status_code not in RETRYABLE_STATUS_CODES | {409}:
+            raise HTTPException(r.status_code, f"Supabase upload failed: {r.text}")
+        failures += 1
+        _raise_if_tus_stalled(failures, offset, data.nbytes)
+        await asyncio.sleep(UPSTREAM_RETRY_BASE_DELAY_SEC * (2 ** (failures - 1)))
+        try:
+            async with SUPABASE_SEM:
+                head = await client.head(location, headers=tus_headers)
+            head.raise_for_status()
+            offset = int(head.headers["Upload-Offset"])
+        except (httpx.HTTPError, KeyError, ValueError):
+            # Keep the last known offset: the next PATCH either lands or answers
+            # 409 and resyncs again, all within the same failure budget.
+            failures += 1
+            _raise_if_tus_stalled(failures, offset, data.nbytes)
+
+
+def _raise_if_tus_stalled(failures: int, offset: int, total: int) -> None:
+    if failures >= UPSTREAM_RETRY_ATTEMPTS:
+        raise HTTPException(502, f"Supabase upload stalled at {offset}/{total} bytes.")
 
 
 async def supabase_delete(object_path: str) -> None:
@@ -830,14 +1353,11 @@ async def supabase_delete(object_path: str) -> None:
         return
 
     delete_url = f"{UPLOAD_BASE}/{SUPABASE_BUCKET}/{object_path}"
-    headers = {
-        "Authorization": f"Bearer {SUPABASE_SERVICE_ROLE}",
-        "apikey": SUPABASE_SERVICE_ROLE,
-    }
 
     try:
-        async with httpx.AsyncClient(timeout=30) as client:
-            await client.delete(delete_url, headers=headers)
+        client = get_http_client("supabase")
+        async with SUPABASE_SEM:
+            await client.delete(delete_url)
     except httpx.HTTPError:
         # Cleanup should not mask the originating exception.
         return
@@ -849,10 +1369,7 @@ def _supabase_rest_headers(
     if not SUPABASE_URL or not SUPABASE_SERVICE_ROLE:
         raise HTTPException(500, "Supabase env not set")
 
-    headers = {
-        "Authorization": f"Bearer {SUPABASE_SERVICE_ROLE}",
-        "apikey": SUPABASE_SERVICE_ROLE,
-    }
+    headers: dict[str, str] = {}
     if include_json:
         headers["Content-Type"] = "application/json"
     if prefer:
@@ -904,8 +1421,11 @@ async def create_async_job(
         "max_attempts": ASYNC_JOB_MAX_ATTEMPTS,
     }
 
-    async with httpx.AsyncClient(timeout=30) as client:
-        response = await client.post(endpoint, headers=headers, json=body)
+    client = get_http_client("supabase")
+    async with SUPABASE_SEM:
+        response = await client.post(
+            endpoint, headers=headers, content=orjson.dumps(body)
+        )
 
     if response.status_code >= 400:
         raise HTTPException(
@@ -922,7 +1442,8 @@ async def get_async_job(job_id: str) -> dict[str, Any] | None:
     endpoint = f"{SUPABASE_URL}/rest/v1/async_jobs"
     headers = _supabase_rest_headers()
 
-    async with httpx.AsyncClient(timeout=30) as client:
+    client = get_http_client("supabase")
+    async with SUPABASE_SEM:
         response = await client.get(
             endpoint,
             headers=headers,
@@ -955,7 +1476,8 @@ async def get_async_job_by_request_id(
     else:
         params["user_id"] = f"eq.{user_id}"
 
-    async with httpx.AsyncClient(timeout=30) as client:
+    client = get_http_client("supabase")
+    async with SUPABASE_SEM:
         response = await client.get(endpoint, headers=headers, params=params)
 
     if response.status_code >= 400:
@@ -1023,7 +1545,8 @@ async def list_async_jobs(
     if user_id:
         params["user_id"] = f"eq.{user_id}"
 
-    async with httpx.AsyncClient(timeout=30) as client:
+    client = get_http_client("supabase")
+    async with SUPABASE_SEM:
         response = await client.get(endpoint, headers=headers, params=params)
 
     if response.status_code >= 400:
@@ -1064,9 +1587,13 @@ async def update_async_job(
     if attempts is not None:
         body["attempts"] = attempts
 
-    async with httpx.AsyncClient(timeout=30) as client:
+    client = get_http_client("supabase")
+    async with SUPABASE_SEM:
         response = await client.patch(
-            endpoint, headers=headers, params={"id": f"eq.{job_id}"}, json=body
+            endpoint,
+            headers=headers,
+            params={"id": f"eq.{job_id}"},
+            content=orjson.dumps(body),
         )
 
     if response.status_code >= 400:
@@ -1107,9 +1634,13 @@ async def claim_next_async_job(*, worker_id: str) -> dict[str, Any] | None:
         if expected_locked_at:
             patch_params["locked_at"] = f"eq.{expected_locked_at}"
 
-        async with httpx.AsyncClient(timeout=30) as client:
+        client = get_http_client("supabase")
+        async with SUPABASE_SEM:
             patch_response = await client.patch(
-                endpoint, headers=patch_headers, params=patch_params, json=body
+                endpoint,
+                headers=patch_headers,
+                params=patch_params,
+                content=orjson.dumps(body),
             )
 
         if patch_response.status_code >= 400:
@@ -1132,9 +1663,12 @@ async def claim_next_async_job(*, worker_id: str) -> dict[str, Any] | None:
         "limit": 20,
     }
 
-    async with httpx.AsyncClient(timeout=30) as client:
+    client = get_http_client("supabase")
+    async with SUPABASE_SEM:
         stale_response = await client.get(
-            endpoint, headers=read_headers, params=stale_params
+            endpoint,
+            headers=read_headers,
+            params=stale_params,
         )
     if stale_response.status_code >= 400:
         raise HTTPException(
@@ -1162,9 +1696,12 @@ async def claim_next_async_job(*, worker_id: str) -> dict[str, Any] | None:
         "limit": 1,
     }
 
-    async with httpx.AsyncClient(timeout=30) as client:
+    client = get_http_client("supabase")
+    async with SUPABASE_SEM:
         queued_response = await client.get(
-            endpoint, headers=read_headers, params=params
+            endpoint,
+            headers=read_headers,
+            params=params,
         )
     if queued_response.status_code >= 400:
         raise HTTPException(
@@ -1186,15 +1723,11 @@ async def get_job_request(request_id: str) -> dict[str, Any] | None:
         raise HTTPException(500, "Supabase env not set")
 
     endpoint = f"{SUPABASE_URL}/rest/v1/job_requests"
-    headers = {
-        "Authorization": f"Bearer {SUPABASE_SERVICE_ROLE}",
-        "apikey": SUPABASE_SERVICE_ROLE,
-    }
 
-    async with httpx.AsyncClient(timeout=30) as client:
+    client = get_http_client("supabase")
+    async with SUPABASE_SEM:
         response = await client.get(
             endpoint,
-            headers=headers,
             params={"request_id": f"eq.{request_id}", "select": "*", "limit": 1},
         )
 
@@ -1217,12 +1750,7 @@ async def create_job_request_processing(
         raise HTTPException(500, "Supabase env not set")
 
     endpoint = f"{SUPABASE_URL}/rest/v1/job_requests"
-    headers = {
-        "Authorization": f"Bearer {SUPABASE_SERVICE_ROLE}",
-        "apikey": SUPABASE_SERVICE_ROLE,
-        "Content-Type": "application/json",
-        "Prefer": "return=minimal",
-    }
+    headers = SUPABASE_MINIMAL_WRITE_HEADERS
     payload = {
         "request_id": request_id,
         "user_id": user_id,
@@ -1230,8 +1758,11 @@ async def create_job_request_processing(
         "status": "processing",
     }
 
-    async with httpx.AsyncClient(timeout=30) as client:
-        response = await client.post(endpoint, headers=headers, json=payload)
+    client = get_http_client("supabase")
+    async with SUPABASE_SEM:
+        response = await client.post(
+            endpoint, headers=headers, content=orjson.dumps(payload)
+        )
 
     if response.status_code in (200, 201):
         return True
@@ -1282,12 +1813,7 @@ async def update_job_request(
         raise HTTPException(500, "Supabase env not set")
 
     endpoint = f"{SUPABASE_URL}/rest/v1/job_requests"
-    headers = {
-        "Authorization": f"Bearer {SUPABASE_SERVICE_ROLE}",
-        "apikey": SUPABASE_SERVICE_ROLE,
-        "Content-Type": "application/json",
-        "Prefer": "return=minimal",
-    }
+    headers = SUPABASE_MINIMAL_WRITE_HEADERS
     payload: dict[str, Any] = {"status": status}
     if response_payload is not None:
         payload["response_payload"] = response_payload
@@ -1296,12 +1822,13 @@ async def update_job_request(
         payload["error_payload"] = {"message": error}
         payload["response_status"] = 500
 
-    async with httpx.AsyncClient(timeout=30) as client:
+    client = get_http_client("supabase")
+    async with SUPABASE_SEM:
         patch_response = await client.patch(
             endpoint,
             headers=headers,
             params={"request_id": f"eq.{request_id}"},
-            json=payload,
+            content=orjson.dumps(payload),
         )
 
     if patch_response.status_code >= 400:
@@ -1411,13 +1938,6 @@ async def insert_pet_video(
 
     created_at = created_at or datetime.now(timezone.utc)
 
-    endpoint = f"{SUPABASE_URL}/rest/v1/pet_videos"
-    headers = {
-        "Authorization": f"Bearer {SUPABASE_SERVICE_ROLE}",
-        "apikey": SUPABASE_SERVICE_ROLE,
-        "Content-Type": "application/json",
-        "Prefer": "return=minimal",
-    }
     payload = {
         "user_id": user_id,
         "video_url": final_url,
@@ -1438,8 +1958,24 @@ async def insert_pet_video(
         "created_at": created_at.isoformat(),
     }
 
-    async with httpx.AsyncClient(timeout=30) as client:
-        response = await client.post(endpoint, headers=headers, json=payload)
+    if _pet_video_insert_queue is not None:
+        try:
+            _pet_video_insert_queue.put_nowait(payload)
+            return
+        except asyncio.QueueFull:
+            # The flusher is falling behind; apply backpressure on this request
+            # rather than growing the queue without bound.
+            pass
+    await _post_pet_video_rows(payload)
+
+
+async def _post_pet_video_rows(rows: dict[str, Any] | list[dict[str, Any]]) -> None:
+    endpoint = f"{SUPABASE_URL}/rest/v1/pet_videos"
+    client = get_http_client("supabase")
+    async with SUPABASE_SEM:
+        response = await client.post(
+            endpoint, headers=SUPABASE_MINIMAL_WRITE_HEADERS, content=orjson.dumps(rows)
+        )
 
     if response.status_code >= 400:
         raise HTTPException(
@@ -1448,24 +1984,166 @@ async def insert_pet_video(
         )
 
 
+# Set while the batching flusher runs; ``insert_pet_video`` then enqueues rows
+# instead of posting them on the request path.
+_pet_video_insert_queue: asyncio.Queue[dict[str, Any]] | None = None
+
+
+async def _flush_pet_video_inserts(queue: asyncio.Queue[dict[str, Any]]) -> None:
+    """Post queued ``pet_videos`` rows as PostgREST array inserts."""
+
+    loop = asyncio.get_running_loop()
+    while True:
+        rows = [await queue.get()]
+        deadline = loop.time() + PET_VIDEO_INSERT_FLUSH_SEC
+        while len(rows) < PET_VIDEO_INSERT_BATCH_SIZE:
+            try:
+                rows.append(await asyncio.wait_for(queue.get(), deadline - loop.time()))
+            except asyncio.TimeoutError:
+                break
+        try:
+            await _post_pet_video_rows(rows)
+        except HTTPException as exc:
+            if 400 <= exc.status_code < 500 and len(rows) > 1:
+                # PostgREST rejects the whole array for one bad row; retry
+                # each row so only the offending one is dropped.
+                await _post_pet_video_rows_individually(rows)
+            else:
+                _log_dropped_pet_video_rows(rows)
+        except Exception:
+            _log_dropped_pet_video_rows(rows)
+        finally:
+            for _ in rows:
+                queue.task_done()
+
+
+async def _post_pet_video_rows_individually(rows: list[dict[str, Any]]) -> None:
+    """Insert rows one at a time, logging only those that still fail."""
+
+    for row in rows:
+        try:
+            await _post_pet_video_rows([row])
+        except Exception:
+            _log_dropped_pet_video_rows([row])
+
+
+def _log_dropped_pet_video_rows(rows: list[dict[str, Any]]) -> None:
+    """Log each ``pet_videos`` row lost to a failed background insert."""
+
+    for row in rows:
+        logger.exception(
+            "Batched pet video insert failed",
+            extra={"user_id": row.get("user_id"), "final_url": row.get("final_url")},
+        )
+
+
+def start_pet_video_insert_flusher() -> asyncio.Task:
+    """Route ``insert_pet_video`` through a queue drained in the background."""
+
+    global _pet_video_insert_queue
+    queue = asyncio.Queue(maxsize=PET_VIDEO_INSERT_QUEUE_MAX)
+    _pet_video_insert_queue = queue
+    flusher = asyncio.create_task(_flush_pet_video_inserts(queue))
+    flusher.add_done_callback(partial(_on_pet_video_insert_flusher_done, queue))
+    return flusher
+
+
+def _on_pet_video_insert_flusher_done(
+    queue: asyncio.Queue[dict[str, Any]], flusher: asyncio.Task
+) -> None:
+    """Fall back to inline inserts if the flusher dies unexpectedly."""
+
+    global _pet_video_insert_queue
+    if flusher.cancelled():
+        return
+    if _pet_video_insert_queue is queue:
+        _pet_video_insert_queue = None
+    logger.error(
+        "Pet video insert flusher stopped; falling back to inline inserts",
+        exc_info=flusher.exception(),
+        extra={"dropped_rows": queue.qsize()},
+    )
+
+
+async def stop_pet_video_insert_flusher(flusher: asyncio.Task) -> None:
+    """Flush rows still queued, then stop the background flusher."""
+
+    global _pet_video_insert_queue
+    queue, _pet_video_insert_queue = _pet_video_insert_queue, None
+    if queue is not None and not flusher.done():
+        # Stop waiting if the flusher dies mid-drain instead of blocking forever.
+        joined = asyncio.ensure_future(queue.join())
+        await asyncio.wait({joined, flusher}, return_when=asyncio.FIRST_COMPLETED)
+        joined.cancel()
+    if flusher.done():
+        # A crash was already logged by _on_pet_video_insert_flusher_done.
+        return
+    flusher.cancel()
+    with suppress(asyncio.CancelledError):
+        await flusher
+
+
+# Canonical 8-4-4-4-12 form, which is what Supabase Auth issues for user ids.
+_UUID_RE = re.compile(
+    r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}", re.IGNORECASE
+)
+
+
 def resolve_user_storage_prefix(user_context: UserContext | None) -> str:
     """Return a sanitized storage prefix for the provided user context."""
 
     if not user_context:
         return "anonymous"
-    try:
-        user_uuid = uuid.UUID(user_context.id)
-    except (ValueError, AttributeError) as exc:
-        raise HTTPException(400, "user_context.id must be a valid UUID") from exc
-    return f"users/{user_uuid}"  # uuid.UUID normalizes the string format
+    user_id = user_context.id
+    if not isinstance(user_id, str) or not _UUID_RE.fullmatch(user_id):
+        raise HTTPException(400, "user_context.id must be a valid UUID")
+    return f"users/{user_id.lower()}"
+
+
+def _safe_storage_prefix(prefix: str) -> str:
+    safe_prefix = prefix.strip("/") or "anonymous"
+    return safe_prefix.replace("..", "")
 
 
 def build_storage_key(prefix: str, category: str, extension: str) -> str:
     """Construct a Supabase object key scoped to the user prefix."""
 
-    safe_prefix = prefix.strip("/") or "anonymous"
-    safe_prefix = safe_prefix.replace("..", "")
-    return f"{safe_prefix}/{category}/{uuid.uuid4()}.{extension}"
+    # 96 random bits as 16 URL-safe chars; shorter than a UUID string.
+    return (
+        f"{_safe_storage_prefix(prefix)}/{category}/"
+        f"{secrets.token_urlsafe(12)}.{extension}"
+    )
+
+
+def build_tts_cache_key(prefix: str, text: str, voice_id: str) -> str:
+    """Deterministic object key for synthesized audio, scoped to the user prefix.
+
+    Everything that changes the ElevenLabs output goes into the digest, so the
+    same script in the same voice always maps to the same object.
+    """
+
+    digest = hashlib.blake2b(
+        "|".join((voice_id, TTS_MODEL_ID, TTS_OUTPUT_FORMAT, text)).encode(),
+        digest_size=16,
+    ).hexdigest()
+    return f"{_safe_storage_prefix(prefix)}/tts-cache/{digest}.mp3"
+
+
+async def find_cached_tts_audio(object_path: str) -> str | None:
+    """Return the public URL of previously synthesized audio, if it exists.
+
+    Lookups go through :func:`head_info`, whose TTL cache answers repeats
+    without another request.
+    """
+
+    public_url = f"{PUBLIC_BASE}/{SUPABASE_BUCKET}/{object_path}"
+    try:
+        status, _, size = await head_info(public_url)
+    except (httpx.HTTPError, HTTPException):
+        return None
+    if status == HTTPStatus.OK and size > 0:
+        return public_url
+    return None
 
 
 async def fetch_binary(
@@ -1474,68 +2152,132 @@ async def fetch_binary(
     max_bytes: int | None = FETCH_MAX_BYTES,
     *,
     allow_private: bool = ALLOW_PRIVATE_URL_FETCHES,
-) -> bytes:
-    """Download binary content from a remote URL with SSRF and size guards."""
+) -> bytearray:
+    """Download binary content from a remote URL with SSRF and size guards.
+
+    Chunks are appended to a single buffer, so peak memory stays at one copy of
+    the body; :func:`supabase_upload` can send the buffer without copying it.
+    """
 
     if max_bytes is not None and max_bytes <= 0:
         raise HTTPException(500, "FETCH_MAX_BYTES must be greater than zero.")
 
     current_url = url
-    async with httpx.AsyncClient(timeout=timeout, follow_redirects=False) as client:
-        for _ in range(MAX_REDIRECT_HOPS + 1):
-            _validate_outbound_url(current_url, allow_private=allow_private)
-
-            async with client.stream("GET", current_url) as response:
-                if response.is_redirect:
-                    redirect_location = response.headers.get("location")
-                    if not redirect_location:
-                        raise HTTPException(
-                            502, "Redirect response missing Location header."
-                        )
-                    current_url = urljoin(str(response.url), redirect_location)
-                    continue
+    client = get_http_client()
+    for _ in range(MAX_REDIRECT_HOPS + 1):
+        _validate_outbound_url(current_url, allow_private=allow_private)
+
+        async with client.stream(
+            "GET", current_url, timeout=timeout, follow_redirects=False
+        ) as response:
+            if response.is_redirect:
+                redirect_location = response.headers.get("location")
+                if not redirect_location:
+                    raise HTTPException(
+                        502, "Redirect response missing Location header."
+                    )
+                current_url = urljoin(str(response.url), redirect_location)
+                continue
 
-                response.raise_for_status()
-
-                if max_bytes is not None:
-                    declared_size = response.headers.get("content-length")
-                    if declared_size:
-                        try:
-                            declared_bytes = int(declared_size)
-                        except (TypeError, ValueError):
-                            declared_bytes = None
-                        if declared_bytes is not None and declared_bytes > max_bytes:
-                            raise HTTPException(
-                                413,
-                                f"Remote file is too large ({declared_size} bytes > {max_bytes}).",
-                            )
-
-                chunks: list[bytes] = []
-                total = 0
-                async for chunk in response.aiter_bytes():
-                    if not chunk:
-                        continue
-                    total += len(chunk)
-                    if max_bytes is not None and total > max_bytes:
+            response.raise_for_status()
+
+            if max_bytes is not None:
+                declared_size = response.headers.get("content-length")
+                if declared_size:
+                    try:
+                        declared_bytes = int(declared_size)
+                    except (TypeError, ValueError):
+                        declared_bytes = None
+                    if declared_bytes is not None and declared_bytes > max_bytes:
                         raise HTTPException(
                             413,
-                            f"Remote file exceeded {max_bytes} bytes while downloading.",
+                            f"Remote file is too large ({declared_size} bytes > {max_bytes}).",
                         )
-                    chunks.append(chunk)
-                return b"".join(chunks)
+
+            buf = bytearray()
+            async for chunk in response.aiter_bytes(FETCH_CHUNK_BYTES):
+                if not chunk:
+                    continue
+                if max_bytes is not None and len(buf) + len(chunk) > max_bytes:
+                    raise HTTPException(
+                        413,
+                        f"Remote file exceeded {max_bytes} bytes while downloading.",
+                    )
+                buf += chunk
+            return buf
 
     raise HTTPException(400, f"Too many redirects (max {MAX_REDIRECT_HOPS}).")
 
 
+# url -> (expires_at, (status, content_type, size), etag); oldest evicted first.
+_head_info_cache: "OrderedDict[str, tuple[float, Tuple[int, str, int], str | None]]" = (
+    OrderedDict()
+)
+
+
 async def head_info(url: str) -> Tuple[int, str, int]:
-    """Retrieve basic HTTP header information for a URL."""
+    """Retrieve basic HTTP header information for a URL.
 
-    current_url = url
-    async with httpx.AsyncClient(timeout=30, follow_redirects=False) as c:
-        for _ in range(MAX_REDIRECT_HOPS + 1):
-            _validate_outbound_url(current_url, allow_private=ALLOW_PRIVATE_URL_FETCHES)
+    Successful results are cached for ``HEAD_INFO_CACHE_TTL_SEC`` so repeated
+    checks of the same asset skip the round trip; 4xx/5xx results are not cached.
+    Expired entries with an ``ETag`` are revalidated with ``If-None-Match`` and
+    a ``304`` keeps the cached result.
+    """
 
-            r = await c.head(current_url)
+    now = time.monotonic()
+    cached = _head_info_cache.get(url)
+    etag = None
+    if cached is not None:
+        expires_at, result, etag = cached
+        if expires_at > now:
+            _head_info_cache.move_to_end(url)
+            return result
+        del _head_info_cache[url]
+
+    result, new_etag = await _fetch_head_info(url, etag=etag)
+    if result[0] == HTTPStatus.NOT_MODIFIED and cached is not None:
+        result, new_etag = cached[1], new_etag or etag
+    if HEAD_INFO_CACHE_TTL_SEC > 0 and result[0] < HTTPStatus.BAD_REQUEST:
+        _head_info_cache[url] = (now + HEAD_INFO_CACHE_TTL_SEC, result, new_etag)
+        while len(_head_info_cache) > HEAD_INFO_CACHE_MAX_ENTRIES:
+            _head_info_cache.popitem(last=False)
+    return result
+
+
+def _entity_size_from_headers(response: httpx.Response) -> int:
+    """Return the full entity size from Content-Range, else Content-Length."""
+
+    if response.status_code == HTTPStatus.PARTIAL_CONTENT:
+        _, _, total = response.headers.get("content-range", "").rpartition("/")
+        return int(total) if total.isdigit() else 0
+    return int(response.headers.get("content-length", "0"))
+
+
+async def _fetch_head_info(
+    url: str, *, etag: str | None = None
+) -> tuple[Tuple[int, str, int], str | None]:
+    """Resolve a URL's status and headers with a single ranged GET.
+
+    Some origins reject HEAD (e.g. GET-signed URLs), so a one-byte ranged GET
+    stands in for it; a ``206`` is reported as ``200`` like a HEAD would be.
+    Returns the ``(status, content_type, size)`` result and the response ETag.
+    """
+
+    probe_headers = {"Range": "bytes=0-0"}
+    if etag:
+        probe_headers["If-None-Match"] = etag
+    current_url = url
+    c = get_http_client()
+    for _ in range(MAX_REDIRECT_HOPS + 1):
+        _validate_outbound_url(current_url, allow_private=ALLOW_PRIVATE_URL_FETCHES)
+
+        async with c.stream(
+            "GET",
+            current_url,
+            headers=probe_headers,
+            timeout=HTTP_TIMEOUTS["probe"],
+            follow_redirects=False,
+        ) as r:
             if r.is_redirect:
                 redirect_location = r.headers.get("location")
                 if not redirect_location:
@@ -1545,10 +2287,31 @@ async def head_info(url: str) -> Tuple[int, str, int]:
                 current_url = urljoin(str(r.url), redirect_location)
                 continue
 
-            if r.status_code >= HTTPStatus.BAD_REQUEST:
-                r = await c.get(current_url, headers={"Range": "bytes=0-1"})
-            size = int(r.headers.get("content-length", "0"))
-            return r.status_code, r.headers.get("content-type", ""), size
+            content_type = r.headers.get("content-type", "")
+            if r.status_code == HTTPStatus.PARTIAL_CONTENT:
+                # Drain the single byte so the connection returns to the pool.
+                await r.aread()
+                return (
+                    HTTPStatus.OK,
+                    content_type,
+                    _entity_size_from_headers(r),
+                ), r.headers.get("etag")
+            if r.status_code != HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE:
+                return (
+                    r.status_code,
+                    content_type,
+                    _entity_size_from_headers(r),
+                ), r.headers.get("etag")
+
+        # Zero-length objects cannot satisfy any range; ask once without one.
+        async with c.stream(
+            "GET", current_url, timeout=HTTP_TIMEOUTS["probe"], follow_redirects=False
+        ) as r:
+            return (
+                r.status_code,
+                r.headers.get("content-type", ""),
+                _entity_size_from_headers(r),
+            ), r.headers.get("etag")
 
     raise HTTPException(400, f"Too many redirects (max {MAX_REDIRECT_HOPS}).")
 
@@ -1556,7 +2319,7 @@ async def head_info(url: str) -> Tuple[int, str, int]:
 def inspect_video_bytes(video_bytes: bytes) -> dict[str, Any]:
     """Inspect MP4 bytes using ffprobe to surface codec/container issues."""
 
-    tmpdir = tempfile.mkdtemp()
+    tmpdir = tempfile.mkdtemp(dir=MEDIA_TMP_DIR)
     in_path = os.path.join(tmpdir, "inspect.mp4")
     try:
         with open(in_path, "wb") as infile:
@@ -1602,24 +2365,56 @@ def inspect_video_bytes(video_bytes: bytes) -> dict[str, Any]:
         shutil.rmtree(tmpdir, ignore_errors=True)
 
 
+async def _range_probe(url: str) -> httpx.Response:
+    """Issue a small ranged GET, revalidating every redirect hop."""
+
+    current_url = url
+    client = get_http_client()
+    for _ in range(MAX_REDIRECT_HOPS + 1):
+        _validate_outbound_url(current_url, allow_private=ALLOW_PRIVATE_URL_FETCHES)
+
+        response = await client.get(
+            current_url,
+            headers={"Range": "bytes=0-1023"},
+            timeout=HTTP_TIMEOUTS["probe"],
+            follow_redirects=False,
+        )
+        if response.is_redirect:
+            redirect_location = response.headers.get("location")
+            if not redirect_location:
+                raise HTTPException(502, "Redirect response missing Location header.")
+            current_url = urljoin(str(response.url), redirect_location)
+            continue
+        return response
+
+    raise HTTPException(400, f"Too many redirects (max {MAX_REDIRECT_HOPS}).")
+
+
 async def collect_video_delivery_debug(url: str) -> dict[str, Any]:
     """Collect download diagnostics for a final video URL."""
 
-    status, content_type, content_length = await head_info(url)
+    # Both probes are independent round trips, so run them concurrently.
+    head_result, range_result = await asyncio.gather(
+        head_info(url), _range_probe(url), return_exceptions=True
+    )
+    if isinstance(head_result, BaseException):
+        raise head_result
+
+    status, content_type, content_length = head_result
     diagnostics: dict[str, Any] = {
         "head_status": status,
         "content_type": content_type,
         "content_length": content_length,
     }
 
-    try:
-        async with httpx.AsyncClient(timeout=30, follow_redirects=True) as client:
-            partial = await client.get(url, headers={"Range": "bytes=0-1023"})
-        diagnostics["range_status"] = partial.status_code
-        diagnostics["accept_ranges"] = partial.headers.get("accept-ranges", "")
-        diagnostics["content_range"] = partial.headers.get("content-range", "")
-    except httpx.HTTPError as exc:
-        diagnostics["range_error"] = type(exc).__name__
+    if isinstance(range_result, httpx.HTTPError):
+        diagnostics["range_error"] = type(range_result).__name__
+    elif isinstance(range_result, BaseException):
+        raise range_result
+    else:
+        diagnostics["range_status"] = range_result.status_code
+        diagnostics["accept_ranges"] = range_result.headers.get("accept-ranges", "")
+        diagnostics["content_range"] = range_result.headers.get("content-range", "")
 
     return diagnostics
 
@@ -1645,6 +2440,47 @@ def _raise_final_video_error(
     )
 
 
+# Prediction id -> event set by the Replicate webhook. Webhook payloads are only
+# used as a wake-up signal; results are always re-read from the Replicate API.
+_replicate_prediction_events: dict[str, asyncio.Event] = {}
+
+# Prediction cache key -> in-flight prediction shared by identical concurrent calls.
+_replicate_inflight: dict[str, "_InflightPrediction"] = {}
+# Prediction cache key -> (expires_at, output_url); oldest entries evicted first.
+_replicate_output_cache: "OrderedDict[str, tuple[float, str]]" = OrderedDict()
+
+
+class _InflightPrediction:
+    """A running prediction task and the number of callers awaiting it."""
+
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: "asyncio.Task[str]") -> None:
+        self.task = task
+        self.waiters = 0
+
+
+def _replicate_cache_key(model: str, payload: dict[str, Any]) -> str:
+    body = orjson.dumps(
+        {"model": model, "input": payload["input"]}, option=orjson.OPT_SORT_KEYS
+    )
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+async def _wait_for_replicate_update(pred_id: str, delay: float) -> None:
+    """Sleep until the next poll, returning early if a webhook arrives."""
+
+    event = _replicate_prediction_events.get(pred_id)
+    if event is None:
+        await asyncio.sleep(delay)
+        return
+    try:
+        await asyncio.wait_for(event.wait(), timeout=delay)
+    except asyncio.TimeoutError:
+        return
+    event.clear()
+
+
 async def replicate_video_from_prompt(
     model: str,
     image_url: str,
@@ -1655,7 +2491,11 @@ async def replicate_video_from_prompt(
     fps: int | None = None,
     input_params: dict[str, Any] | None = None,
 ) -> str:
-    """Create a video using a specified Replicate model."""
+    """Create a video using a specified Replicate model.
+
+    Calls with identical model inputs share one in-flight prediction, and with
+    ``REPLICATE_OUTPUT_CACHE_TTL_SEC`` set, reuse its output URL afterwards.
+    """
 
     if not REPLICATE_API_TOKEN:
         raise HTTPException(500, "Replicate API token not set")
@@ -1664,61 +2504,171 @@ async def replicate_video_from_prompt(
     payload = build_model_payload(
         model, image_url, prompt, seconds, resolution, audio_url, fps, input_params
     )
+    cache_key = _replicate_cache_key(model, payload)
+
+    cached = _replicate_output_cache.get(cache_key)
+    if cached is not None:
+        expires_at, output_url = cached
+        if expires_at > time.monotonic():
+            _replicate_output_cache.move_to_end(cache_key)
+            return output_url
+        del _replicate_output_cache[cache_key]
+
+    # Identical concurrent requests (retries, double submits) share one prediction.
+    inflight = _replicate_inflight.get(cache_key)
+    if inflight is None:
+        inflight = _InflightPrediction(
+            asyncio.ensure_future(_run_replicate_prediction(model, payload, cache_key))
+        )
+        _replicate_inflight[cache_key] = inflight
 
-    headers = {
-        "Authorization": f"Token {REPLICATE_API_TOKEN}",
-        "Content-Type": "application/json",
-    }
+        def _forget(_task: "asyncio.Task[str]", entry=inflight) -> None:
+            if _replicate_inflight.get(cache_key) is entry:
+                del _replicate_inflight[cache_key]
+
+        inflight.task.add_done_callback(_forget)
+
+    inflight.waiters += 1
+    try:
+        return await asyncio.shield(inflight.task)
+    finally:
+        inflight.waiters -= 1
+        if inflight.waiters == 0 and not inflight.task.done():
+            # Last interested caller went away (e.g. cancelled); stop polling.
+            inflight.task.cancel()
+
+
+async def _run_replicate_prediction(
+    model: str, payload: dict[str, Any], cache_key: str
+) -> str:
+    """Create a prediction, wait for it and remember its output URL."""
+
+    async with REPLICATE_PREDICTION_SEM or nullcontext():
+        output_url = await _create_and_poll_prediction(model, payload)
+
+    if REPLICATE_OUTPUT_CACHE_TTL_SEC > 0:
+        _replicate_output_cache[cache_key] = (
+            time.monotonic() + REPLICATE_OUTPUT_CACHE_TTL_SEC,
+            output_url,
+        )
+        _replicate_output_cache.move_to_end(cache_key)
+        while len(_replicate_output_cache) > REPLICATE_OUTPUT_CACHE_MAX_ENTRIES:
+            _replicate_output_cache.popitem(last=False)
+    return output_url
+
+
+async def _create_and_poll_prediction(model: str, payload: dict[str, Any]) -> str:
+    create_url = f"{REPLICATE_API_BASE}/models/{model}/predictions"
+    if PUBLIC_CALLBACK_BASE:
+        payload["webhook"] = f"{PUBLIC_CALLBACK_BASE}/webhooks/replicate"
+        payload["webhook_events_filter"] = ["completed"]
+
+    client = get_http_client("replicate")
+    body = orjson.dumps(payload)
+    create = await send_with_retry(
+        lambda: client.post(create_url, content=body, headers=JSON_CONTENT_HEADERS),
+        REPLICATE_SEM,
+        idempotent=False,
+    )
+    if create.status_code >= 400:
+        raise HTTPException(
+            create.status_code,
+            f"Replicate {model} create failed: {create.text}",
+        )
+    pred = orjson.loads(create.content)
+    pred_id = pred.get("id")
+    if not pred_id:
+        raise HTTPException(500, "Replicate missing prediction id")
+
+    poll_delay = REPLICATE_POLL_INTERVAL_SEC
+    if PUBLIC_CALLBACK_BASE:
+        # Completion arrives via webhook when it reaches this process; keep a slow
+        # poll as a fallback (e.g. the async worker has no HTTP listener).
+        _replicate_prediction_events[pred_id] = asyncio.Event()
+        poll_delay = REPLICATE_WEBHOOK_FALLBACK_POLL_SEC
+    try:
+        output_url = await _poll_replicate_prediction(
+            client, model, pred_id, initial_delay=poll_delay
+        )
+    except asyncio.CancelledError:
+        # Nobody is waiting for this render any more; stop paying for it.
+        await _cancel_replicate_prediction(client, pred_id)
+        raise
+    finally:
+        _replicate_prediction_events.pop(pred_id, None)
+    return output_url
 
-    create_url = f"https://api.replicate.com/v1/models/{model}/predictions"
 
-    async with httpx.AsyncClient(timeout=600) as client:
-        create = await client.post(create_url, headers=headers, json=payload)
-        if create.status_code >= 400:
+async def _cancel_replicate_prediction(client: httpx.AsyncClient, pred_id: str) -> None:
+    """Best-effort cancel of a prediction whose result is no longer needed."""
+
+    try:
+        await client.post(
+            f"{REPLICATE_API_BASE}/predictions/{pred_id}/cancel",
+            timeout=10,
+        )
+    except httpx.HTTPError as exc:
+        logger.warning(
+            "replicate_cancel_failed prediction_id=%s error=%s",
+            pred_id,
+            type(exc).__name__,
+        )
+
+
+async def _poll_replicate_prediction(
+    client: httpx.AsyncClient, model: str, pred_id: str, *, initial_delay: float
+) -> str:
+    """Poll a prediction until it finishes and return its output URL."""
+
+    poll_started_at = time.monotonic()
+    poll_delay = initial_delay
+    while True:
+        elapsed = time.monotonic() - poll_started_at
+        if elapsed > REPLICATE_POLL_TIMEOUT_SEC:
             raise HTTPException(
-                create.status_code,
-                f"Replicate {model} create failed: {create.text}",
+                504,
+                (
+                    "Replicate prediction timed out before completion "
+                    f"(prediction_id={pred_id})."
+                ),
             )
-        pred = create.json()
-        pred_id = pred.get("id")
-        if not pred_id:
-            raise HTTPException(500, "Replicate missing prediction id")
-
-        poll_started_at = time.monotonic()
-        while True:
-            elapsed = time.monotonic() - poll_started_at
-            if elapsed > REPLICATE_POLL_TIMEOUT_SEC:
+
+        getr = await send_with_retry(
+            lambda: client.get(f"{REPLICATE_API_BASE}/predictions/{pred_id}"),
+            REPLICATE_SEM,
+        )
+        getr.raise_for_status()
+        data = orjson.loads(getr.content)
+        status = data.get("status")
+        if status in ("succeeded", "failed", "canceled"):
+            if status != "succeeded":
                 raise HTTPException(
-                    504,
+                    400,
                     (
-                        "Replicate prediction timed out before completion "
-                        f"(prediction_id={pred_id})."
+                        f"{model} {status}: {data.get('error')} | "
+                        f"logs: {data.get('logs')}"
                     ),
                 )
-
-            getr = await client.get(
-                f"https://api.replicate.com/v1/predictions/{pred_id}",
-                headers=headers,
-            )
-            getr.raise_for_status()
-            data = getr.json()
-            status = data.get("status")
-            if status in ("succeeded", "failed", "canceled"):
-                if status != "succeeded":
-                    raise HTTPException(
-                        400,
-                        (
-                            f"{model} {status}: {data.get('error')} | "
-                            f"logs: {data.get('logs')}"
-                        ),
-                    )
-                output = data.get("output")
-                if isinstance(output, list) and output:
-                    return output[-1]
-                if isinstance(output, str):
-                    return output
-                raise HTTPException(500, "Replicate missing output URL")
-            await asyncio.sleep(REPLICATE_POLL_INTERVAL_SEC)
+            output = data.get("output")
+            if isinstance(output, list) and output:
+                return output[-1]
+            if isinstance(output, str):
+                return output
+            raise HTTPException(500, "Replicate missing output URL")
+        # Long generations run for minutes; back off so they don't burn rate limit.
+        # A Retry-After on the poll response can only stretch the wait.
+        retry_after = retry_after_seconds(getr)
+        await _wait_for_replicate_update(
+            pred_id,
+            poll_delay if retry_after is None else max(poll_delay, retry_after),
+        )
+        poll_delay = max(
+            initial_delay,
+            min(
+                REPLICATE_POLL_MAX_INTERVAL_SEC,
+                poll_delay * REPLICATE_POLL_BACKOFF_FACTOR,
+            ),
+        )
 
 
 async def generate_video_from_prompt(
@@ -1762,6 +2712,9 @@ def _build_mux_command(
         # add 0.6s delay to audio start and 0.6s outro buffer
         "adelay=600|600,apad=pad_dur=0.6",
         "-shortest",
+        # moov atom up front so playback starts before the whole file arrives
+        "-movflags",
+        "+faststart",
         output_path,
     ]
 
@@ -1835,45 +2788,94 @@ def run_ffmpeg_runtime_smoke_check() -> None:
         logger.info("ffmpeg runtime smoke check passed (path=%s)", ffmpeg_path)
 
 
-@app.on_event("startup")
-async def startup_runtime_checks() -> None:
-    """Run startup-time runtime checks."""
+async def _download_to_file(client: httpx.AsyncClient, url: str, path: str) -> None:
+    """Stream ``url`` into ``path`` without buffering the whole body."""
 
-    run_ffmpeg_runtime_smoke_check()
+    async with client.stream("GET", url) as response:
+        response.raise_for_status()
+        with open(path, "wb") as f:
+            async for chunk in response.aiter_bytes(FETCH_CHUNK_BYTES):
+                f.write(chunk)
 
 
-async def mux_video_audio(video_url: str, audio_url: str) -> bytes:
-    """Combine a video and an audio track into a single MP4 file."""
+async def _run_subprocess(
+    cmd: list[str], stdin_data: bytes | bytearray | memoryview | None = None
+) -> None:
+    """Run ``cmd`` without blocking the event loop, discarding stdout.
+
+    Mirrors ``subprocess.run(check=True)``: a non-zero exit raises
+    :class:`subprocess.CalledProcessError` with the decoded stderr. The child is
+    killed if the awaiting task is cancelled. ``stdin_data`` is written to the
+    child's stdin; otherwise stdin is closed so concurrent ffmpeg runs never
+    compete for (or wait on) the server's own stdin.
+    """
 
-    tmpdir = tempfile.mkdtemp()
+    proc = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdin=(
+            asyncio.subprocess.DEVNULL
+            if stdin_data is None
+            else asyncio.subprocess.PIPE
+        ),
+        stdout=asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    try:
+        if stdin_data is None:
+            _, stderr = await proc.communicate()
+        else:
+            _, stderr = await proc.communicate(stdin_data)
+    except asyncio.CancelledError:
+        proc.kill()
+        await proc.wait()
+        raise
+    if proc.returncode:
+        raise subprocess.CalledProcessError(
+            proc.returncode, cmd, stderr=stderr.decode(errors="replace")
+        )
+
+
+def _read_file_bytes(path: str) -> bytes:
+    with open(path, "rb") as infile:
+        return infile.read()
+
+
+async def mux_video_audio(video_url: str, audio: str | bytes | bytearray) -> bytes:
+    """Combine a video and an audio track into a single MP4 file.
+
+    ``audio`` is either a URL or the MP3 bytes themselves; bytes are fed to
+    ffmpeg on stdin, so freshly synthesized audio is neither downloaded again
+    from storage nor written to disk. Inputs are downloaded here rather than
+    handed to ffmpeg as URLs so every fetch goes through our client. The video
+    input and the output stay seekable files: MP4 demuxing needs to seek to the
+    ``moov`` atom, and a seekable output keeps a regular (non-fragmented) layout.
+    """
+
+    tmpdir = tempfile.mkdtemp(dir=MEDIA_TMP_DIR)
     vpath = os.path.join(tmpdir, "in.mp4")
-    apath = os.path.join(tmpdir, "in.mp3")
     fpath = os.path.join(tmpdir, "out.mp4")
 
     try:
-        async with httpx.AsyncClient() as client:
-            vr = await client.get(video_url)
-            vr.raise_for_status()
-            with open(vpath, "wb") as f:
-                f.write(vr.content)
-            ar = await client.get(audio_url)
-            ar.raise_for_status()
-            with open(apath, "wb") as f:
-                f.write(ar.content)
+        client = get_http_client()
+        if isinstance(audio, str):
+            apath = os.path.join(tmpdir, "in.mp3")
+            audio_stdin: bytes | bytearray | None = None
+            # Video and audio live on different hosts; fetch both at once.
+            await _gather_cancelling_on_error(
+                _download_to_file(client, video_url, vpath),
+                _download_to_file(client, audio, apath),
+            )
+        else:
+            apath = "pipe:0"
+            audio_stdin = audio
+            await _download_to_file(client, video_url, vpath)
 
         ffmpeg_path = get_ffmpeg_path()
         cmd = _build_mux_command(ffmpeg_path, vpath, apath, fpath)
-        subprocess.run(
-            cmd,
-            check=True,
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.PIPE,
-            text=True,
-        )
+        await _run_subprocess(cmd, audio_stdin)
 
-        with open(fpath, "rb") as outfile:
-            final_bytes = outfile.read()
-        return final_bytes
+        # The muxed MP4 can be tens of MB; read it off the event loop.
+        return await asyncio.to_thread(_read_file_bytes, fpath)
     except FileNotFoundError as exc:
         logger.error("ffmpeg executable not found during mux")
         raise HTTPException(500, "ffmpeg not available in runtime") from exc
@@ -1881,13 +2883,13 @@ async def mux_video_audio(video_url: str, audio_url: str) -> bytes:
         logger.error("ffmpeg mux failed: %s", (exc.stderr or "").strip())
         raise HTTPException(500, "ffmpeg mux failed") from exc
     finally:
-        shutil.rmtree(tmpdir, ignore_errors=True)
+        await asyncio.to_thread(shutil.rmtree, tmpdir, ignore_errors=True)
 
 
 def _compress_video_bytes(video_bytes: bytes, crf: int) -> bytes:
     """Re-encode MP4 bytes with H.264/AAC using a configurable CRF value."""
 
-    tmpdir = tempfile.mkdtemp()
+    tmpdir = tempfile.mkdtemp(dir=MEDIA_TMP_DIR)
     in_path = os.path.join(tmpdir, "in.mp4")
     out_path = os.path.join(tmpdir, "out.mp4")
 
@@ -2113,9 +3115,9 @@ async def health(_: None = Depends(require_auth)):
     return {"ok": True}
 
 
-@app.get("/models")
-async def list_supported_models(_: None = Depends(require_auth)):
-    """List all supported i2v models and routing metadata."""
+@lru_cache(maxsize=1)
+def _models_response_body() -> bytes:
+    """Serialize the static ``/models`` catalog once per process."""
 
     def _serialize_tunable_params(
         tunable_params: list[dict[str, Any]],
@@ -2147,11 +3149,20 @@ async def list_supported_models(_: None = Depends(require_auth)):
             "runnable": config.get("runnable", True),
             "is_default": model_id == DEFAULT_MODEL,
         }
-    return {
-        "supported_models": models,
-        "default_model": DEFAULT_MODEL,
-        "routing_defaults": VIDEO_MODEL_ROUTES,
-    }
+    return orjson.dumps(
+        {
+            "supported_models": models,
+            "default_model": DEFAULT_MODEL,
+            "routing_defaults": VIDEO_MODEL_ROUTES,
+        }
+    )
+
+
+@app.get("/models")
+async def list_supported_models(_: None = Depends(require_auth)):
+    """List all supported i2v models and routing metadata."""
+
+    return Response(_models_response_body(), media_type="application/json")
 
 
 @app.post("/quota_summary")
@@ -2348,6 +3359,45 @@ async def _resolve_job_model(
     return chosen, params, resolved, plan_tier
 
 
+async def _gather_cancelling_on_error(*aws: Any) -> list[Any]:
+    """Await awaitables concurrently, cancelling the rest if one fails."""
+
+    tasks = [asyncio.ensure_future(aw) for aw in aws]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+
+async def _resolve_job_model_checking_image_url(
+    image_url: str, **resolve_kwargs: Any
+) -> tuple[Any, ...]:
+    """Resolve the job model while the image URL's DNS/SSRF check runs in a thread.
+
+    The URL check does a blocking ``getaddrinfo`` and model resolution may wait on
+    Supabase for the plan tier; overlapping them takes one round trip off the
+    critical path. URL errors still take precedence over resolution errors.
+    """
+
+    url_check, resolution = await asyncio.gather(
+        asyncio.to_thread(
+            _validate_outbound_url,
+            image_url,
+            allow_private=ALLOW_PRIVATE_URL_FETCHES,
+        ),
+        _resolve_job_model(**resolve_kwargs),
+        return_exceptions=True,
+    )
+    if isinstance(url_check, BaseException):
+        raise url_check
+    if isinstance(resolution, BaseException):
+        raise resolution
+    return resolution
+
+
 def _unpack_resolved_job_model(
     result: tuple[Any, ...],
 ) -> tuple[str, dict[str, Any], dict[str, Any], str]:
@@ -2363,10 +3413,10 @@ def _unpack_resolved_job_model(
 async def process_prompt_only_request(req: JobPromptOnly) -> dict[str, Any]:
     normalized_request_id = _normalize_request_id(req.request_id)
     user_id = req.user_context.id if req.user_context else None
-    _validate_outbound_url(req.image_url, allow_private=ALLOW_PRIVATE_URL_FETCHES)
 
     model, input_params, resolved, plan_tier = _unpack_resolved_job_model(
-        await _resolve_job_model(
+        await _resolve_job_model_checking_image_url(
+            req.image_url,
             seconds=req.seconds,
             resolution=req.resolution,
             quality=req.quality,
@@ -2414,8 +3464,9 @@ async def process_prompt_only_request(req: JobPromptOnly) -> dict[str, Any]:
             input_params=input_params,
         )
         video_bytes = await fetch_binary(video_url)
-        upload_ready_bytes, compression_debug = prepare_video_for_upload_with_debug(
-            video_bytes
+        # ffmpeg re-encodes can take seconds; keep them off the event loop.
+        upload_ready_bytes, compression_debug = await asyncio.to_thread(
+            prepare_video_for_upload_with_debug, video_bytes
         )
         final_key = build_storage_key(prefix, "videos", "mp4")
         final_url = await supabase_upload(upload_ready_bytes, final_key, "video/mp4")
@@ -2498,12 +3549,14 @@ async def process_prompt_only_request(req: JobPromptOnly) -> dict[str, Any]:
 
 
 async def process_prompt_tts_request(req: JobPromptTTS) -> dict[str, Any]:
+    # Fail oversized scripts before claiming quota or starting the render.
+    validate_tts_text(req.text)
     normalized_request_id = _normalize_request_id(req.request_id)
     user_id = req.user_context.id if req.user_context else None
-    _validate_outbound_url(req.image_url, allow_private=ALLOW_PRIVATE_URL_FETCHES)
 
     model, input_params, resolved, plan_tier = _unpack_resolved_job_model(
-        await _resolve_job_model(
+        await _resolve_job_model_checking_image_url(
+            req.image_url,
             seconds=req.seconds,
             resolution=req.resolution,
             quality=req.quality,
@@ -2544,14 +3597,58 @@ async def process_prompt_tts_request(req: JobPromptTTS) -> dict[str, Any]:
     audio_key: str | None = None
 
     try:
-        mp3_bytes = await elevenlabs_tts_bytes(req.text, req.voice_id)
-        audio_key = build_storage_key(prefix, "audio", "mp3")
-        audio_public_url = await supabase_upload(mp3_bytes, audio_key, "audio/mpeg")
+        supports_audio_in = get_model_config(model)["capabilities"].get(
+            "supportsAudioIn"
+        )
 
         final_url: str | None = None
         video_url: str | None = None
+        audio_public_url: str | None = None
+        audio_bytes = bytearray()
+
+        def render_silent_video():
+            return generate_video_from_prompt(
+                model,
+                req.image_url,
+                req.prompt,
+                resolved["seconds"],
+                resolved["resolution"],
+                fps=resolved.get("fps"),
+                input_params=input_params,
+            )
 
-        if get_model_config(model)["capabilities"].get("supportsAudioIn"):
+        async def synthesize_audio(keep: bytearray | None = None) -> str:
+            # Stream synthesized audio straight into the upload, optionally
+            # keeping a copy so the mux does not download it again.
+            async with elevenlabs_tts_stream(req.text, req.voice_id) as audio_chunks:
+                if keep is not None:
+                    audio_chunks = _tee_stream(audio_chunks, keep)
+                return await supabase_upload(audio_chunks, audio_key, "audio/mpeg")
+
+        if TTS_CACHE_ENABLED:
+            audio_key = build_tts_cache_key(prefix, req.text, req.voice_id)
+            audio_public_url = await find_cached_tts_audio(audio_key)
+            if audio_public_url:
+                # Earlier jobs returned this URL; never delete it on failure.
+                audio_key = None
+        else:
+            audio_key = build_storage_key(prefix, "audio", "mp3")
+
+        if audio_public_url:
+            if not supports_audio_in:
+                video_url = await render_silent_video()
+        elif supports_audio_in:
+            audio_public_url = await synthesize_audio()
+        else:
+            # The render does not need the audio here, so synthesize it while the
+            # provider renders the silent video; the mux reuses the kept bytes.
+            # If either side fails the other is cancelled, which also cancels
+            # the Replicate prediction.
+            audio_public_url, video_url = await _gather_cancelling_on_error(
+                synthesize_audio(audio_bytes), render_silent_video()
+            )
+
+        if supports_audio_in:
             video_url = await generate_video_from_prompt(
                 model,
                 req.image_url,
@@ -2564,26 +3661,18 @@ async def process_prompt_tts_request(req: JobPromptTTS) -> dict[str, Any]:
             )
             final_key = build_storage_key(prefix, "videos", "mp4")
             final_bytes = await fetch_binary(video_url)
-            upload_ready_bytes, _compression_debug = (
-                prepare_video_for_upload_with_debug(final_bytes)
+            upload_ready_bytes, _compression_debug = await asyncio.to_thread(
+                prepare_video_for_upload_with_debug, final_bytes
             )
             final_url = await supabase_upload(
                 upload_ready_bytes, final_key, "video/mp4"
             )
         else:
-            video_url = await generate_video_from_prompt(
-                model,
-                req.image_url,
-                req.prompt,
-                resolved["seconds"],
-                resolved["resolution"],
-                fps=resolved.get("fps"),
-                input_params=input_params,
+            final_bytes = await mux_video_audio(
+                video_url, audio_bytes or audio_public_url
             )
-
-            final_bytes = await mux_video_audio(video_url, audio_public_url)
-            upload_ready_bytes, _compression_debug = (
-                prepare_video_for_upload_with_debug(final_bytes)
+            upload_ready_bytes, _compression_debug = await asyncio.to_thread(
+                prepare_video_for_upload_with_debug, final_bytes
             )
             final_key = build_storage_key(prefix, "videos", "mp4")
             final_url = await supabase_upload(
@@ -2755,7 +3844,11 @@ async def create_job_with_prompt_and_tts(
     return await process_prompt_tts_request(req)
 
 
-@app.post("/async/jobs/prompt_only", status_code=202)
+@app.post(
+    "/async/jobs/prompt_only",
+    status_code=202,
+    response_model=AsyncJobEnqueueResponse,
+)
 async def enqueue_prompt_only_job(req: JobPromptOnly, _: None = Depends(require_auth)):
     normalized_request_id = _normalize_request_id(req.request_id)
     if normalized_request_id:
@@ -2777,8 +3870,13 @@ async def enqueue_prompt_only_job(req: JobPromptOnly, _: None = Depends(require_
     }
 
 
-@app.post("/async/jobs/prompt_tts", status_code=202)
+@app.post(
+    "/async/jobs/prompt_tts",
+    status_code=202,
+    response_model=AsyncJobEnqueueResponse,
+)
 async def enqueue_prompt_tts_job(req: JobPromptTTS, _: None = Depends(require_auth)):
+    validate_tts_text(req.text)
     normalized_request_id = _normalize_request_id(req.request_id)
     if normalized_request_id:
         req.request_id = normalized_request_id
@@ -2799,7 +3897,7 @@ async def enqueue_prompt_tts_job(req: JobPromptTTS, _: None = Depends(require_au
     }
 
 
-@app.get("/async/jobs/{job_id}")
+@app.get("/async/jobs/{job_id}", response_model=AsyncJobResponse)
 async def get_async_job_status(job_id: str, _: None = Depends(require_auth)):
     row = await get_async_job(job_id)
     if not row:
@@ -2807,7 +3905,7 @@ async def get_async_job_status(job_id: str, _: None = Depends(require_auth)):
     return _serialize_async_job(row)
 
 
-@app.get("/async/jobs")
+@app.get("/async/jobs", response_model=AsyncJobListResponse)
 async def list_async_job_statuses(
     status: Literal["queued", "processing", "succeeded", "failed"] | None = None,
     user_id: str | None = None,
@@ -2818,7 +3916,7 @@ async def list_async_job_statuses(
     return {"jobs": [_serialize_async_job(row) for row in rows]}
 
 
-@app.post("/async/worker/run_once")
+@app.post("/async/worker/run_once", response_model=AsyncWorkerRunResponse)
 async def trigger_async_worker_run_once(
     limit: int = 1,
     worker_id: str | None = None,
@@ -2831,6 +3929,52 @@ async def trigger_async_worker_run_once(
     }
 
 
+async def verify_replicate_webhook(request: Request) -> None:
+    """Check the Standard Webhooks signature Replicate sends with callbacks.
+
+    Enforced only when ``REPLICATE_WEBHOOK_SECRET`` (the ``whsec_...`` value from
+    Replicate's webhook settings) is configured.
+    """
+
+    if not REPLICATE_WEBHOOK_SECRET:
+        return
+
+    webhook_id = request.headers.get("webhook-id")
+    timestamp = request.headers.get("webhook-timestamp")
+    signatures = request.headers.get("webhook-signature")
+    if not webhook_id or not timestamp or not signatures:
+        raise HTTPException(401, "Missing webhook signature headers")
+    try:
+        sent_at = int(timestamp)
+    except ValueError:
+        raise HTTPException(401, "Invalid webhook timestamp") from None
+    if abs(time.time() - sent_at) > REPLICATE_WEBHOOK_TOLERANCE_SEC:
+        raise HTTPException(401, "Webhook timestamp outside tolerance")
+
+    body = await request.body()
+    key = base64.b64decode(REPLICATE_WEBHOOK_SECRET.removeprefix("whsec_"))
+    signed = f"{webhook_id}.{timestamp}.".encode() + body
+    expected = base64.b64encode(hmac.new(key, signed, hashlib.sha256).digest())
+    for candidate in signatures.split():
+        version, _, signature = candidate.partition(",")
+        if version == "v1" and hmac.compare_digest(signature.encode(), expected):
+            return
+    raise HTTPException(401, "Invalid webhook signature")
+
+
+@app.post("/webhooks/replicate")
+async def replicate_webhook(
+    payload: ReplicateWebhookPayload,
+    _: None = Depends(verify_replicate_webhook),
+):
+    """Wake the poll loop waiting on a prediction as soon as Replicate reports it."""
+
+    event = _replicate_prediction_events.get(payload.id)
+    if event is not None:
+        event.set()
+    return {"ok": True}
+
+
 # ===== Debug =====
 @app.post("/debug/head")
 async def debug_head(req: HeadRequest, _: None = Depends(require_auth)):
@@ -2860,11 +4004,12 @@ async def debug_final_video(
         diagnostics["download_error_detail"] = exc.detail
         return {"final_url": req.url, "diagnostics": diagnostics}
 
-    diagnostics["probe"] = inspect_video_bytes(sample_bytes)
+    diagnostics["probe"] = await asyncio.to_thread(inspect_video_bytes, sample_bytes)
     diagnostics["downloaded_bytes"] = len(sample_bytes)
 
     if req.include_compression_debug:
-        diagnostics["compression"] = analyze_video_compression(
+        diagnostics["compression"] = await asyncio.to_thread(
+            analyze_video_compression,
             sample_bytes,
             target_bytes=req.target_bytes,
         )
@@ -5,6 +5,11 @@ import uuid
 
 import main
 
+try:
+    import uvloop
+except ImportError:  # uvicorn[standard] only installs uvloop on non-Windows hosts
+    uvloop = None
+
 
 async def _run_loop(limit: int, poll_interval: float, worker_id: str) -> None:
     while True:
@@ -13,6 +18,21 @@ async def _run_loop(limit: int, poll_interval: float, worker_id: str) -> None:
             await asyncio.sleep(poll_interval)
 
 
+async def _closing_http_clients(coro) -> None:
+    try:
+        await coro
+    finally:
+        # Close the pooled upstream clients before the loop shuts down.
+        await main.close_http_clients()
+
+
+def _run(coro) -> None:
+    if uvloop is not None:
+        uvloop.run(_closing_http_clients(coro))
+    else:
+        asyncio.run(_closing_http_clients(coro))
+
+
 def main_cli() -> None:
     parser = argparse.ArgumentParser(description="Run Talking Pet async queue worker")
     parser.add_argument("--once", action="store_true", help="Process at most one batch then exit")
@@ -33,10 +53,10 @@ def main_cli() -> None:
     logging.basicConfig(level=logging.INFO)
 
     if args.once:
-        asyncio.run(main.run_async_worker_once(worker_id=args.worker_id, limit=args.limit))
+        _run(main.run_async_worker_once(worker_id=args.worker_id, limit=args.limit))
         return
 
-    asyncio.run(_run_loop(args.limit, args.poll_interval, args.worker_id))
+    _run(_run_loop(args.limit, args.poll_interval, args.worker_id))
 
 
 if __name__ == "__main__":
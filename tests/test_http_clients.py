@@ -0,0 +1,48 @@
+import unittest
+from unittest.mock import patch
+
+import main
+
+
+class HttpClientPoolTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncTearDown(self):
+        await main.close_http_clients()
+
+    async def test_upstream_clients_are_isolated_and_carry_auth(self):
+        with (
+            patch("main.SUPABASE_SERVICE_ROLE", "service-role"),
+            patch("main.ELEVEN_API_KEY", "eleven-key"),
+            patch("main.REPLICATE_API_TOKEN", "replicate-token"),
+        ):
+            supabase = main.get_http_client("supabase")
+            eleven = main.get_http_client("elevenlabs")
+            replicate = main.get_http_client("replicate")
+            default = main.get_http_client()
+
+        self.assertEqual(len({id(supabase), id(eleven), id(replicate), id(default)}), 4)
+        self.assertIs(main.get_http_client("supabase"), supabase)
+        self.assertEqual(supabase.headers["authorization"], "Bearer service-role")
+        self.assertEqual(supabase.headers["apikey"], "service-role")
+        self.assertEqual(eleven.headers["xi-api-key"], "eleven-key")
+        self.assertEqual(replicate.headers["authorization"], "Token replicate-token")
+        self.assertNotIn("authorization", default.headers)
+        for client in (supabase, eleven, replicate, default):
+            self.assertEqual(
+                client._transport._pool._keepalive_expiry,
+                main.HTTP_KEEPALIVE_EXPIRY_SEC,
+            )
+
+    async def test_closed_clients_are_recreated(self):
+        client = main.get_http_client()
+        await main.close_http_clients()
+
+        self.assertTrue(client.is_closed)
+        self.assertIsNot(main.get_http_client(), client)
+
+    def test_unknown_upstream_is_rejected(self):
+        with self.assertRaises(ValueError):
+            main.get_http_client("d-id")
+
+
+if __name__ == "__main__":
+    unittest.main()
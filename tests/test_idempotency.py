@@ -268,11 +268,7 @@ class IdempotencyBehaviorTest(unittest.IsolatedAsyncioTestCase):
             mock_client = AsyncMock()
             mock_client.post.return_value = post_response
 
-            client_cm = AsyncMock()
-            client_cm.__aenter__.return_value = mock_client
-            client_cm.__aexit__.return_value = False
-
-            with patch("main.httpx.AsyncClient", return_value=client_cm):
+            with patch("main.get_http_client", return_value=mock_client):
                 mock_get.return_value = {
                     "request_id": "bbbbbbbb-bbbb-bbbb-bbbb-bbbbbbbbbbbb",
                     "endpoint": "/jobs_prompt_tts",
@@ -1,69 +1,55 @@
+import asyncio
 import unittest
+from contextlib import asynccontextmanager
 from unittest.mock import AsyncMock, patch
 
+import httpx
 from fastapi.testclient import TestClient
 
 import main
 
 
-class BuildModelPayloadResolutionTestCase(unittest.TestCase):
-    def test_wan26_flash_respects_resolution(self):
-        payload = main.build_model_payload(
-            "wan-video/wan2.6-i2v-flash",
-            image_url="https://example.com/image.jpg",
-            prompt="hello",
-            seconds=6,
-            resolution="1080p",
-        )
+@asynccontextmanager
+async def _fake_tts_stream(*_args):
+    yield [b"mp3"]
 
-        self.assertEqual(payload["input"]["resolution"], "1080p")
 
-    def test_hailuo23_passes_1080p_resolution(self):
-        payload = main.build_model_payload(
+class BuildModelPayloadResolutionTestCase(unittest.TestCase):
+    def test_models_pass_1080p_resolution_through(self):
+        for model in (
+            "wan-video/wan2.6-i2v-flash",
             "minimax/hailuo-2.3",
-            image_url="https://example.com/image.jpg",
-            prompt="hello",
-            seconds=6,
-            resolution="1080p",
-        )
-
-        self.assertEqual(payload["input"]["resolution"], "1080p")
-
-    def test_seedance_pro_fast_passes_1080p_resolution(self):
-        payload = main.build_model_payload(
             "bytedance/seedance-1-pro-fast",
-            image_url="https://example.com/image.jpg",
-            prompt="hello",
-            seconds=6,
-            resolution="1080p",
-        )
-
-        self.assertEqual(payload["input"]["resolution"], "1080p")
-
-    def test_kling_switches_to_pro_mode_for_1080p(self):
-        payload = main.build_model_payload(
-            "kwaivgi/kling-v2.6",
-            image_url="https://example.com/image.jpg",
-            prompt="hello",
-            seconds=6,
-            resolution="1080p",
-            input_params={"mode": "standard"},
-        )
+        ):
+            with self.subTest(model=model):
+                payload = main.build_model_payload(
+                    model,
+                    image_url="https://example.com/image.jpg",
+                    prompt="hello",
+                    seconds=6,
+                    resolution="1080p",
+                )
 
-        self.assertEqual(payload["input"]["mode"], "pro")
-        self.assertEqual(payload["input"]["aspect_ratio"], "16:9")
+                self.assertEqual(payload["input"]["resolution"], "1080p")
 
-    def test_kling_uses_standard_mode_for_non_1080p(self):
-        payload = main.build_model_payload(
-            "kwaivgi/kling-v2.6",
-            image_url="https://example.com/image.jpg",
-            prompt="hello",
-            seconds=6,
-            resolution="768p",
-        )
+    def test_kling_mode_and_aspect_ratio_follow_resolution(self):
+        cases = [
+            ("1080p", {"mode": "standard"}, "pro", "16:9"),
+            ("768p", None, "standard", "1:1"),
+        ]
+        for resolution, input_params, mode, aspect_ratio in cases:
+            with self.subTest(resolution=resolution):
+                payload = main.build_model_payload(
+                    "kwaivgi/kling-v2.6",
+                    image_url="https://example.com/image.jpg",
+                    prompt="hello",
+                    seconds=6,
+                    resolution=resolution,
+                    input_params=input_params,
+                )
 
-        self.assertEqual(payload["input"]["mode"], "standard")
-        self.assertEqual(payload["input"]["aspect_ratio"], "1:1")
+                self.assertEqual(payload["input"]["mode"], mode)
+                self.assertEqual(payload["input"]["aspect_ratio"], aspect_ratio)
 
     def test_wan25_i2v_maps_audio_fields(self):
         payload = main.build_model_payload(
@@ -260,17 +246,24 @@ class RoutingResolutionTestCase(unittest.IsolatedAsyncioTestCase):
         mock_tier.assert_not_awaited()
 
 
-class ModelsEndpointResolutionTestCase(unittest.TestCase):
-    def setUp(self) -> None:
-        self._auth_enabled = main.API_AUTH_ENABLED
+class ModelsEndpointResolutionTestCase(unittest.IsolatedAsyncioTestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls._auth_enabled = main.API_AUTH_ENABLED
         main.API_AUTH_ENABLED = False
-        self.client = TestClient(main.app)
+        # Call the app in-process on the test's own loop, without TestClient's
+        # sync portal thread.
+        cls.client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=main.app), base_url="http://testserver"
+        )
 
-    def tearDown(self) -> None:
-        main.API_AUTH_ENABLED = self._auth_enabled
+    @classmethod
+    def tearDownClass(cls) -> None:
+        asyncio.run(cls.client.aclose())
+        main.API_AUTH_ENABLED = cls._auth_enabled
 
-    def test_supported_models_expose_enriched_metadata(self):
-        response = self.client.get("/models")
+    async def test_supported_models_expose_enriched_metadata(self):
+        response = await self.client.get("/models")
         self.assertEqual(response.status_code, 200)
 
         payload = response.json()
@@ -284,8 +277,8 @@ class ModelsEndpointResolutionTestCase(unittest.TestCase):
         self.assertIn("tunable_params", wan26_fast)
         self.assertIn("min_plan_tier", wan26_fast)
 
-    def test_tunable_params_include_description_alias_for_help(self):
-        response = self.client.get("/models")
+    async def test_tunable_params_include_description_alias_for_help(self):
+        response = await self.client.get("/models")
         self.assertEqual(response.status_code, 200)
 
         payload = response.json()
@@ -302,17 +295,17 @@ class ModelsEndpointResolutionTestCase(unittest.TestCase):
                     self.assertIn("description", param)
                     self.assertEqual(param["description"], param["help"])
 
-    def test_models_endpoint_exposes_new_default(self):
-        response = self.client.get("/models")
+    async def test_models_endpoint_exposes_new_default(self):
+        response = await self.client.get("/models")
         self.assertEqual(response.status_code, 200)
 
         payload = response.json()
         self.assertEqual(payload["default_model"], "wan-video/wan2.6-i2v-flash")
 
-    def test_override_model_rejects_when_plan_disallows_model(self):
+    async def test_override_model_rejects_when_plan_disallows_model(self):
         with patch("main.resolve_plan_tier", new_callable=AsyncMock) as mock_tier:
             mock_tier.return_value = "free"
-            response = self.client.post(
+            response = await self.client.post(
                 "/resolve_model",
                 json={
                     "seconds": 6,
@@ -328,8 +321,8 @@ class ModelsEndpointResolutionTestCase(unittest.TestCase):
 
         self.assertEqual(response.status_code, 403)
 
-    def test_override_model_rejects_unknown_slug(self):
-        response = self.client.post(
+    async def test_override_model_rejects_unknown_slug(self):
+        response = await self.client.post(
             "/resolve_model",
             json={
                 "seconds": 6,
@@ -346,12 +339,12 @@ class ModelsEndpointResolutionTestCase(unittest.TestCase):
         self.assertEqual(response.status_code, 400)
         self.assertIn("Unsupported model", response.json()["detail"])
 
-    def test_resolve_model_endpoint_shape_and_normalization(self):
+    async def test_resolve_model_endpoint_shape_and_normalization(self):
         with patch(
             "model_routing.resolve_plan_tier", new_callable=AsyncMock
         ) as mock_tier:
             mock_tier.return_value = "free"
-            response = self.client.post(
+            response = await self.client.post(
                 "/resolve_model",
                 json={
                     "seconds": 9,
@@ -377,8 +370,8 @@ class ModelsEndpointResolutionTestCase(unittest.TestCase):
         self.assertIsNone(payload["resolved"]["fps"])
         self.assertEqual(payload["resolved"]["resolution"], "480p")
 
-    def test_resolve_model_normalizes_legacy_best_quality_alias(self):
-        response = self.client.post(
+    async def test_resolve_model_normalizes_legacy_best_quality_alias(self):
+        response = await self.client.post(
             "/resolve_model",
             json={
                 "seconds": 6,
@@ -397,8 +390,8 @@ class ModelsEndpointResolutionTestCase(unittest.TestCase):
         self.assertEqual(payload["resolved"]["quality"], "quality")
         self.assertTrue(payload["resolved_model_slug"])
 
-    def test_resolve_model_accepts_camel_case_payload(self):
-        response = self.client.post(
+    async def test_resolve_model_accepts_camel_case_payload(self):
+        response = await self.client.post(
             "/resolve_model",
             json={
                 "seconds": 6,
@@ -589,6 +582,12 @@ class MuxCommandTestCase(unittest.TestCase):
         self.assertIn("0:v:0", cmd)
         self.assertIn("1:a:0", cmd)
 
+    def test_mux_command_places_moov_atom_first(self):
+        cmd = main._build_mux_command("ffmpeg", "in.mp4", "in.mp3", "out.mp4")
+
+        self.assertEqual(cmd[cmd.index("-movflags") + 1], "+faststart")
+        self.assertEqual(cmd[-1], "out.mp4")
+
 
 class QualityNormalizationTestCase(unittest.TestCase):
     def test_quality_aliases_normalize(self):
@@ -721,7 +720,7 @@ class JobsEndpointResponseContractTestCase(unittest.TestCase):
     def test_jobs_prompt_tts_response_contains_audio_video_and_final_url(self):
         with (
             patch("main._resolve_job_model", new_callable=AsyncMock) as mock_resolve,
-            patch("main.elevenlabs_tts_bytes", new_callable=AsyncMock) as mock_tts,
+            patch("main.elevenlabs_tts_stream", side_effect=_fake_tts_stream),
             patch(
                 "main.build_storage_key",
                 side_effect=["audio/file.mp3", "videos/final.mp4"],
@@ -749,7 +748,6 @@ class JobsEndpointResponseContractTestCase(unittest.TestCase):
                 {},
                 {"seconds": 5, "resolution": "720p", "fps": 24},
             )
-            mock_tts.return_value = b"mp3"
             mock_upload.side_effect = [
                 "https://supabase/audio.mp3",
                 "https://supabase/final.mp4",
@@ -822,7 +820,7 @@ class JobsEndpointResponseContractTestCase(unittest.TestCase):
     def test_jobs_prompt_tts_accepts_alias_payload_fields(self):
         with (
             patch("main._resolve_job_model", new_callable=AsyncMock) as mock_resolve,
-            patch("main.elevenlabs_tts_bytes", new_callable=AsyncMock) as mock_tts,
+            patch("main.elevenlabs_tts_stream", side_effect=_fake_tts_stream),
             patch(
                 "main.build_storage_key",
                 side_effect=["audio/file.mp3", "videos/final.mp4"],
@@ -850,7 +848,6 @@ class JobsEndpointResponseContractTestCase(unittest.TestCase):
                 {},
                 {"seconds": 5, "resolution": "720p", "fps": 24},
             )
-            mock_tts.return_value = b"mp3"
             mock_upload.side_effect = [
                 "https://supabase/audio.mp3",
                 "https://supabase/final.mp4",
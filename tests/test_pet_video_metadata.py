@@ -1,27 +1,50 @@
+import asyncio
 import unittest
+from contextlib import asynccontextmanager
 from datetime import datetime, timezone
-from unittest.mock import AsyncMock, patch
+from unittest.mock import AsyncMock, Mock, patch
+
+import httpx
+import orjson
 
 import main
 
+_CREATED_AT = datetime(2024, 1, 1, tzinfo=timezone.utc)
+_CREATED_AT_ISO = _CREATED_AT.isoformat()
+# Public URLs returned by the audio and then the final-video upload.
+_UPLOAD_URLS = ("https://public.audio/audio.mp3", "https://public.final/video.mp4")
+
+
+@asynccontextmanager
+async def _fake_tts_stream(*_args):
+    yield [b"mp3"]
+
+
+# Validated once; tests take a shallow model_copy() so handler-side field
+# assignments (e.g. request_id) never leak between tests.
+_PROMPT_TTS_REQUEST = main.JobPromptTTS(
+    image_url="https://example.com/pet.jpg",
+    prompt="Say hi",
+    text="Hello!",
+    voice_id="voice-123",
+    seconds=6,
+    resolution="768p",
+    user_context=main.UserContext(id="11111111-1111-1111-1111-111111111111"),
+)
+
 
 class InsertPetVideoHelperTest(unittest.IsolatedAsyncioTestCase):
     async def test_insert_pet_video_posts_expected_payload(self):
-        created_at = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        response_mock = Mock(spec=httpx.Response, status_code=201, text="")
 
-        response_mock = AsyncMock()
-        response_mock.status_code = 201
-        response_mock.text = ""
-
-        client_mock = AsyncMock()
-        client_mock.post = AsyncMock(return_value=response_mock)
+        client_mock = AsyncMock(spec=httpx.AsyncClient)
+        client_mock.post.return_value = response_mock
 
         with (
             patch("main.SUPABASE_URL", "https://supabase.test"),
             patch("main.SUPABASE_SERVICE_ROLE", "service-role"),
-            patch("main.httpx.AsyncClient") as async_client_cls,
+            patch("main.get_http_client", return_value=client_mock) as get_client,
         ):
-            async_client_cls.return_value.__aenter__.return_value = client_mock
 
             await main.insert_pet_video(
                 user_id="user-123",
@@ -34,22 +57,21 @@ class InsertPetVideoHelperTest(unittest.IsolatedAsyncioTestCase):
                 resolution="768p",
                 duration=6,
                 model="wan-video/wan-2.2-s2v",
-                created_at=created_at,
+                created_at=_CREATED_AT,
             )
 
+        get_client.assert_called_once_with("supabase")
         client_mock.post.assert_awaited_once()
         call_kwargs = client_mock.post.await_args.kwargs
         self.assertEqual(
             call_kwargs["headers"],
             {
-                "Authorization": "Bearer service-role",
-                "apikey": "service-role",
                 "Content-Type": "application/json",
                 "Prefer": "return=minimal",
             },
         )
         self.assertEqual(
-            call_kwargs["json"],
+            orjson.loads(call_kwargs["content"]),
             {
                 "user_id": "user-123",
                 "video_url": "https://public.final/video.mp4",
@@ -62,12 +84,181 @@ class InsertPetVideoHelperTest(unittest.IsolatedAsyncioTestCase):
                 "resolution": "768p",
                 "duration": 6,
                 "model": "wan-video/wan-2.2-s2v",
-                "created_at": created_at.isoformat(),
+                # Defaults to the registry cost when the caller omits it.
+                "credit_cost": main.get_credit_cost_for_model("wan-video/wan-2.2-s2v"),
+                "plan_tier": None,
+                "routing_quality": None,
+                "created_at": _CREATED_AT_ISO,
             },
         )
 
 
+class BatchedPetVideoInsertTest(unittest.IsolatedAsyncioTestCase):
+    async def test_queued_rows_are_posted_as_one_array(self):
+        response_mock = Mock(spec=httpx.Response, status_code=201)
+        client_mock = AsyncMock(spec=httpx.AsyncClient)
+        client_mock.post.return_value = response_mock
+
+        with (
+            patch("main.SUPABASE_URL", "https://supabase.test"),
+            patch("main.SUPABASE_SERVICE_ROLE", "service-role"),
+            patch("main.PET_VIDEO_INSERT_FLUSH_SEC", 0.05),
+            patch("main.get_http_client", return_value=client_mock),
+        ):
+            flusher = main.start_pet_video_insert_flusher()
+            for index in range(3):
+                await main.insert_pet_video(
+                    user_id="user-123",
+                    final_url=f"https://public.final/video-{index}.mp4",
+                    provider_video_url=None,
+                    image_url="https://example.com/pet.jpg",
+                    script=None,
+                    prompt="Wave hello",
+                    voice_id=None,
+                    resolution="768p",
+                    duration=6,
+                    model="wan-video/wan-2.2-s2v",
+                    credit_cost=1,
+                )
+            client_mock.post.assert_not_awaited()
+            await main.stop_pet_video_insert_flusher(flusher)
+
+        client_mock.post.assert_awaited_once()
+        rows = orjson.loads(client_mock.post.await_args.kwargs["content"])
+        self.assertEqual(
+            [row["final_url"] for row in rows],
+            [f"https://public.final/video-{index}.mp4" for index in range(3)],
+        )
+        self.assertIsNone(main._pet_video_insert_queue)
+
+    @staticmethod
+    async def _insert(index: int) -> None:
+        await main.insert_pet_video(
+            user_id="user-123",
+            final_url=f"https://public.final/video-{index}.mp4",
+            provider_video_url=None,
+            image_url="https://example.com/pet.jpg",
+            script=None,
+            prompt="Wave hello",
+            voice_id=None,
+            resolution="768p",
+            duration=6,
+            model="wan-video/wan-2.2-s2v",
+            credit_cost=1,
+        )
+
+    async def test_full_queue_posts_rows_inline(self):
+        client_mock = AsyncMock(spec=httpx.AsyncClient)
+        client_mock.post.return_value = Mock(spec=httpx.Response, status_code=201)
+
+        with (
+            patch("main.SUPABASE_URL", "https://supabase.test"),
+            patch("main.SUPABASE_SERVICE_ROLE", "service-role"),
+            patch("main.PET_VIDEO_INSERT_FLUSH_SEC", 0.05),
+            patch("main.PET_VIDEO_INSERT_QUEUE_MAX", 1),
+            patch("main.get_http_client", return_value=client_mock),
+        ):
+            flusher = main.start_pet_video_insert_flusher()
+            await self._insert(0)
+            await self._insert(1)
+            # The second row did not fit in the queue and was posted inline.
+            client_mock.post.assert_awaited_once()
+            await main.stop_pet_video_insert_flusher(flusher)
+
+        self.assertEqual(client_mock.post.await_count, 2)
+
+    async def test_rejected_batch_retries_rows_individually(self):
+        bad_url = "https://public.final/video-1.mp4"
+
+        async def post(endpoint, **kwargs):
+            rows = orjson.loads(kwargs["content"])
+            rejected = isinstance(rows, list) and len(rows) > 1
+            if rejected or any(row["final_url"] == bad_url for row in rows):
+                return Mock(spec=httpx.Response, status_code=400, text="bad row")
+            return Mock(spec=httpx.Response, status_code=201)
+
+        client_mock = AsyncMock(spec=httpx.AsyncClient)
+        client_mock.post.side_effect = post
+
+        with (
+            patch("main.SUPABASE_URL", "https://supabase.test"),
+            patch("main.SUPABASE_SERVICE_ROLE", "service-role"),
+            patch("main.PET_VIDEO_INSERT_FLUSH_SEC", 0.05),
+            patch("main.get_http_client", return_value=client_mock),
+            patch("main.logger.exception") as mock_exception,
+        ):
+            flusher = main.start_pet_video_insert_flusher()
+            for index in range(3):
+                await self._insert(index)
+            await main.stop_pet_video_insert_flusher(flusher)
+
+        posted = [
+            orjson.loads(call.kwargs["content"])
+            for call in client_mock.post.await_args_list
+        ]
+        self.assertEqual(len(posted[0]), 3)
+        self.assertEqual(
+            [rows[0]["final_url"] for rows in posted[1:]],
+            [f"https://public.final/video-{index}.mp4" for index in range(3)],
+        )
+        mock_exception.assert_called_once()
+        self.assertEqual(mock_exception.call_args.kwargs["extra"]["final_url"], bad_url)
+        self.assertEqual(
+            mock_exception.call_args.kwargs["extra"]["user_id"], "user-123"
+        )
+
+    async def test_dead_flusher_falls_back_to_inline_inserts(self):
+        client_mock = AsyncMock(spec=httpx.AsyncClient)
+        client_mock.post.return_value = Mock(spec=httpx.Response, status_code=201)
+
+        with (
+            patch("main.SUPABASE_URL", "https://supabase.test"),
+            patch("main.SUPABASE_SERVICE_ROLE", "service-role"),
+            patch("main.get_http_client", return_value=client_mock),
+            # Breaks the batch deadline arithmetic so the flusher task crashes.
+            patch("main.PET_VIDEO_INSERT_FLUSH_SEC", None),
+            patch("main.logger.error") as mock_error,
+        ):
+            flusher = main.start_pet_video_insert_flusher()
+            await self._insert(0)
+            await asyncio.sleep(0.01)
+            self.assertTrue(flusher.done())
+            self.assertIsNone(main._pet_video_insert_queue)
+
+            await self._insert(1)
+            await asyncio.wait_for(
+                main.stop_pet_video_insert_flusher(flusher), timeout=1
+            )
+
+        mock_error.assert_called_once()
+        client_mock.post.assert_awaited_once()
+
+
 class HandlerMetadataTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.mock_generate = self._patch(
+            "main.generate_video_from_prompt", new_callable=AsyncMock
+        )
+        self.mock_generate.return_value = "https://model/video.mp4"
+        self.mock_fetch = self._patch("main.fetch_binary", new_callable=AsyncMock)
+        self.mock_upload = self._patch("main.supabase_upload", new_callable=AsyncMock)
+        self._patch(
+            "main.prepare_video_for_upload_with_debug",
+            return_value=(b"compressed-video", {"meets_target": True}),
+        )
+        self.mock_storage_key = self._patch("main.build_storage_key")
+        self.mock_insert = self._patch("main.insert_pet_video", new_callable=AsyncMock)
+        self._patch(
+            "main.collect_video_delivery_debug",
+            new_callable=AsyncMock,
+            return_value={"head_status": 200, "content_length": 100},
+        )
+
+    def _patch(self, target, **kwargs):
+        patcher = patch(target, **kwargs)
+        self.addCleanup(patcher.stop)
+        return patcher.start()
+
     async def test_create_job_with_prompt_records_metadata(self):
         req = main.JobPromptOnly(
             image_url="https://example.com/pet.jpg",
@@ -80,57 +271,193 @@ class HandlerMetadataTest(unittest.IsolatedAsyncioTestCase):
             ),
         )
 
-        with (
-            patch(
-                "main.generate_video_from_prompt", new_callable=AsyncMock
-            ) as mock_generate,
-            patch("main.fetch_binary", new_callable=AsyncMock) as mock_fetch,
-            patch("main.supabase_upload", new_callable=AsyncMock) as mock_upload,
-            patch(
-                "main.prepare_video_for_upload_with_debug",
-                return_value=(b"compressed-video", {"meets_target": True}),
-            ),
-            patch("main.build_storage_key", return_value="videos/final.mp4"),
-            patch("main.insert_pet_video", new_callable=AsyncMock) as mock_insert,
-            patch(
-                "main.collect_video_delivery_debug", new_callable=AsyncMock
-            ) as mock_debug,
-        ):
-            mock_generate.return_value = "https://model/video.mp4"
-            mock_fetch.return_value = b"video-bytes"
-            mock_upload.return_value = "https://public.final/video.mp4"
+        self.mock_fetch.return_value = b"video-bytes"
+        self.mock_upload.return_value = "https://public.final/video.mp4"
+        self.mock_storage_key.return_value = "videos/final.mp4"
 
-            mock_debug.return_value = {"head_status": 200, "content_length": 100}
-            result = await main.create_job_with_prompt(req)
+        result = await main.create_job_with_prompt(req)
 
-        mock_insert.assert_awaited_once()
-        insert_kwargs = mock_insert.await_args.kwargs
+        self.mock_insert.assert_awaited_once_with(
+            user_id="00000000-0000-0000-0000-000000000000",
+            final_url="https://public.final/video.mp4",
+            provider_video_url="https://model/video.mp4",
+            image_url="https://example.com/pet.jpg",
+            script=None,
+            prompt="Say hi",
+            voice_id=None,
+            resolution="720p",
+            duration=5,
+            model="wan-video/wan2.6-i2v-flash",
+            credit_cost=2,
+            plan_tier="creator",
+            routing_quality="fast",
+        )
         self.assertEqual(
-            insert_kwargs,
+            result,
             {
-                "user_id": "00000000-0000-0000-0000-000000000000",
+                "video_url": "https://model/video.mp4",
                 "final_url": "https://public.final/video.mp4",
-                "provider_video_url": "https://model/video.mp4",
-                "image_url": "https://example.com/pet.jpg",
-                "script": None,
-                "prompt": "Say hi",
-                "voice_id": None,
-                "resolution": "720p",
-                "duration": 5,
-                "model": "wan-video/wan2.6-i2v-flash",
             },
         )
+        upload_args = self.mock_upload.await_args.args
+        self.assertEqual(upload_args[0], b"compressed-video")
+
+    async def test_create_job_with_prompt_and_tts_records_metadata(self):
+        req = _PROMPT_TTS_REQUEST.model_copy()
+
+        self.mock_fetch.return_value = b"video"
+        self.mock_upload.side_effect = list(_UPLOAD_URLS)
+        self.mock_storage_key.side_effect = ["audio/file.mp3", "videos/final.mp4"]
+
+        with (
+            patch("main.elevenlabs_tts_stream", side_effect=_fake_tts_stream),
+            patch(
+                "main.mux_video_audio", new_callable=AsyncMock, return_value=b"muxed"
+            ),
+        ):
+            result = await main.create_job_with_prompt_and_tts(req)
+
+        self.mock_insert.assert_awaited_once_with(
+            user_id="11111111-1111-1111-1111-111111111111",
+            final_url="https://public.final/video.mp4",
+            provider_video_url="https://model/video.mp4",
+            image_url="https://example.com/pet.jpg",
+            script="Hello!",
+            prompt="Say hi",
+            voice_id="voice-123",
+            resolution="480p",
+            duration=6,
+            model="bytedance/seedance-1-pro-fast",
+            credit_cost=1,
+            plan_tier="free",
+            routing_quality="fast",
+        )
         self.assertEqual(
             result,
             {
+                "audio_url": "https://public.audio/audio.mp3",
                 "video_url": "https://model/video.mp4",
                 "final_url": "https://public.final/video.mp4",
             },
         )
-        upload_args = mock_upload.await_args.args
-        self.assertEqual(upload_args[0], b"compressed-video")
+        self.assertEqual(
+            self.mock_upload.await_args_list[1].args[0], b"compressed-video"
+        )
 
-    async def test_create_job_with_prompt_and_tts_records_metadata(self):
+
+class PromptTtsPipelineTest(unittest.IsolatedAsyncioTestCase):
+    async def test_audio_upload_is_cancelled_when_video_generation_fails(self):
+        req = _PROMPT_TTS_REQUEST.model_copy()
+        upload_started = asyncio.Event()
+        upload_cancelled = []
+
+        async def slow_upload(*_args):
+            upload_started.set()
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                upload_cancelled.append(True)
+                raise
+
+        async def failing_generate(*_args, **_kwargs):
+            await upload_started.wait()
+            raise main.HTTPException(502, "provider down")
+
+        with (
+            patch("main.elevenlabs_tts_stream", side_effect=_fake_tts_stream),
+            patch("main.generate_video_from_prompt", side_effect=failing_generate),
+            patch("main.supabase_upload", side_effect=slow_upload),
+            patch("main.build_storage_key", return_value="audio/file.mp3"),
+            patch("main.supabase_delete", new_callable=AsyncMock) as mock_delete,
+        ):
+
+            with self.assertRaises(main.HTTPException) as exc:
+                await main.create_job_with_prompt_and_tts(req)
+
+        self.assertEqual(exc.exception.status_code, 502)
+        self.assertEqual(upload_cancelled, [True])
+        mock_delete.assert_awaited_once_with("audio/file.mp3")
+
+    async def test_video_render_is_cancelled_when_tts_fails(self):
+        req = _PROMPT_TTS_REQUEST.model_copy()
+        render_started = asyncio.Event()
+        render_cancelled = []
+
+        @asynccontextmanager
+        async def failing_tts_stream(*_args):
+            await render_started.wait()
+            raise main.HTTPException(400, "voice not found")
+            yield  # pragma: no cover
+
+        async def slow_generate(*_args, **_kwargs):
+            render_started.set()
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                render_cancelled.append(True)
+                raise
+
+        with (
+            patch("main.elevenlabs_tts_stream", side_effect=failing_tts_stream),
+            patch("main.generate_video_from_prompt", side_effect=slow_generate),
+            patch("main.build_storage_key", return_value="audio/file.mp3"),
+            patch("main.supabase_delete", new_callable=AsyncMock),
+        ):
+            with self.assertRaises(main.HTTPException) as exc:
+                await main.create_job_with_prompt_and_tts(req)
+
+        self.assertEqual(exc.exception.status_code, 400)
+        self.assertEqual(render_cancelled, [True])
+
+    async def test_cached_tts_audio_skips_synthesis_and_upload(self):
+        req = _PROMPT_TTS_REQUEST.model_copy()
+        cache_key = main.build_tts_cache_key(
+            "users/11111111-1111-1111-1111-111111111111", "Hello!", "voice-123"
+        )
+
+        with (
+            patch("main.TTS_CACHE_ENABLED", True),
+            patch("main.PUBLIC_BASE", "https://public"),
+            patch(
+                "main.head_info",
+                new_callable=AsyncMock,
+                return_value=(200, "audio/mpeg", 2048),
+            ) as mock_head,
+            patch("main.elevenlabs_tts_stream") as mock_tts,
+            patch(
+                "main.generate_video_from_prompt",
+                new_callable=AsyncMock,
+                return_value="https://model/video.mp4",
+            ),
+            patch(
+                "main.mux_video_audio", new_callable=AsyncMock, return_value=b"muxed"
+            ) as mock_mux,
+            patch(
+                "main.prepare_video_for_upload_with_debug",
+                return_value=(b"compressed-video", {"meets_target": True}),
+            ),
+            patch(
+                "main.supabase_upload",
+                new_callable=AsyncMock,
+                return_value="https://public.final/video.mp4",
+            ) as mock_upload,
+            patch("main.insert_pet_video", new_callable=AsyncMock),
+            patch(
+                "main.collect_video_delivery_debug",
+                new_callable=AsyncMock,
+                return_value={"head_status": 200, "content_length": 100},
+            ),
+        ):
+            result = await main.create_job_with_prompt_and_tts(req)
+
+        cached_url = f"https://public/pets/{cache_key}"
+        mock_head.assert_awaited_once_with(cached_url)
+        mock_tts.assert_not_called()
+        mock_mux.assert_awaited_once_with("https://model/video.mp4", cached_url)
+        mock_upload.assert_awaited_once()
+        self.assertEqual(result["audio_url"], cached_url)
+
+    async def test_synthesized_audio_is_muxed_from_memory(self):
         req = main.JobPromptTTS(
             image_url="https://example.com/pet.jpg",
             prompt="Say hi",
@@ -138,72 +465,49 @@ class HandlerMetadataTest(unittest.IsolatedAsyncioTestCase):
             voice_id="voice-123",
             seconds=6,
             resolution="768p",
-            model=None,
-            user_context=main.UserContext(id="11111111-1111-1111-1111-111111111111"),
         )
 
+        @asynccontextmanager
+        async def tts_stream(*_args):
+            async def chunks():
+                yield b"ID3"
+                yield b"mp3"
+
+            yield chunks()
+
+        async def upload(content, object_path, content_type):
+            if content_type == "audio/mpeg":
+                async for _chunk in content:
+                    pass
+                return "https://public/audio.mp3"
+            return "https://public.final/video.mp4"
+
         with (
-            patch("main.elevenlabs_tts_bytes", new_callable=AsyncMock) as mock_tts,
+            patch("main.elevenlabs_tts_stream", side_effect=tts_stream),
             patch(
-                "main.generate_video_from_prompt", new_callable=AsyncMock
-            ) as mock_generate,
-            patch("main.mux_video_audio", new_callable=AsyncMock) as mock_mux,
-            patch("main.fetch_binary", new_callable=AsyncMock) as mock_fetch,
-            patch(
-                "main.build_storage_key",
-                side_effect=["audio/file.mp3", "videos/final.mp4"],
+                "main.generate_video_from_prompt",
+                new_callable=AsyncMock,
+                return_value="https://model/video.mp4",
             ),
             patch(
-                "main.supabase_upload",
-                new_callable=AsyncMock,
-            ) as mock_upload,
+                "main.mux_video_audio", new_callable=AsyncMock, return_value=b"muxed"
+            ) as mock_mux,
             patch(
                 "main.prepare_video_for_upload_with_debug",
                 return_value=(b"compressed-video", {"meets_target": True}),
             ),
-            patch("main.insert_pet_video", new_callable=AsyncMock) as mock_insert,
+            patch("main.supabase_upload", side_effect=upload),
+            patch("main.insert_pet_video", new_callable=AsyncMock),
             patch(
-                "main.collect_video_delivery_debug", new_callable=AsyncMock
-            ) as mock_debug,
+                "main.collect_video_delivery_debug",
+                new_callable=AsyncMock,
+                return_value={"head_status": 200, "content_length": 100},
+            ),
         ):
-            mock_tts.return_value = b"mp3"
-            mock_generate.return_value = "https://model/video.mp4"
-            mock_mux.return_value = b"muxed"
-            mock_fetch.return_value = b"video"
-            mock_upload.side_effect = [
-                "https://public.audio/audio.mp3",
-                "https://public.final/video.mp4",
-            ]
-
-            mock_debug.return_value = {"head_status": 200, "content_length": 100}
             result = await main.create_job_with_prompt_and_tts(req)
 
-        mock_insert.assert_awaited_once()
-        insert_kwargs = mock_insert.await_args.kwargs
-        self.assertEqual(
-            insert_kwargs,
-            {
-                "user_id": "11111111-1111-1111-1111-111111111111",
-                "final_url": "https://public.final/video.mp4",
-                "provider_video_url": "https://model/video.mp4",
-                "image_url": "https://example.com/pet.jpg",
-                "script": "Hello!",
-                "prompt": "Say hi",
-                "voice_id": "voice-123",
-                "resolution": "480p",
-                "duration": 6,
-                "model": "bytedance/seedance-1-pro-fast",
-            },
-        )
-        self.assertEqual(
-            result,
-            {
-                "audio_url": "https://public.audio/audio.mp3",
-                "video_url": "https://model/video.mp4",
-                "final_url": "https://public.final/video.mp4",
-            },
-        )
-        self.assertEqual(mock_upload.await_args_list[1].args[0], b"compressed-video")
+        mock_mux.assert_awaited_once_with("https://model/video.mp4", b"ID3mp3")
+        self.assertEqual(result["audio_url"], "https://public/audio.mp3")
 
 
 class ModelParamsAllowlistTest(unittest.IsolatedAsyncioTestCase):
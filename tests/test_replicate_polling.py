@@ -0,0 +1,306 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import time
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import orjson
+from fastapi.testclient import TestClient
+
+import main
+
+
+def _response(
+    payload: dict, status_code: int = 200, headers: dict | None = None
+) -> MagicMock:
+    response = MagicMock()
+    response.status_code = status_code
+    response.headers = headers or {}
+    response.content = orjson.dumps(payload)
+    response.raise_for_status.return_value = None
+    return response
+
+
+_PREDICTION_ARGS = (
+    "wan-video/wan-2.2-s2v",
+    "https://example.com/pet.jpg",
+    "Wave hello",
+    6,
+    "768p",
+)
+
+
+class ReplicatePollingTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        main._replicate_output_cache.clear()
+        main._replicate_inflight.clear()
+
+    async def test_poll_delay_backs_off_up_to_cap(self):
+        client = AsyncMock()
+        client.post.return_value = _response({"id": "pred-1"}, status_code=201)
+        client.get.side_effect = [_response({"status": "processing"})] * 5 + [
+            _response({"status": "succeeded", "output": "https://cdn/out.mp4"})
+        ]
+
+        with (
+            patch("main.REPLICATE_API_TOKEN", "token"),
+            patch("main.REPLICATE_POLL_INTERVAL_SEC", 1.0),
+            patch("main.REPLICATE_POLL_MAX_INTERVAL_SEC", 3.0),
+            patch("main.get_http_client", return_value=client),
+            patch("main.asyncio.sleep", new_callable=AsyncMock) as mock_sleep,
+        ):
+            output = await main.replicate_video_from_prompt(
+                "wan-video/wan-2.2-s2v",
+                "https://example.com/pet.jpg",
+                "Wave hello",
+                6,
+                "768p",
+                audio_url="https://example.com/audio.mp3",
+            )
+
+        self.assertEqual(output, "https://cdn/out.mp4")
+        delays = [call.args[0] for call in mock_sleep.await_args_list]
+        self.assertEqual(delays, [1.0, 1.5, 2.25, 3.0, 3.0])
+
+    async def test_poll_honours_longer_retry_after(self):
+        client = AsyncMock()
+        client.post.return_value = _response({"id": "pred-3"}, status_code=201)
+        client.get.side_effect = [
+            _response({"status": "processing"}, headers={"Retry-After": "5"}),
+            _response({"status": "processing"}, headers={"Retry-After": "0"}),
+            _response({"status": "succeeded", "output": "https://cdn/out.mp4"}),
+        ]
+
+        with (
+            patch("main.REPLICATE_API_TOKEN", "token"),
+            patch("main.REPLICATE_POLL_INTERVAL_SEC", 1.0),
+            patch("main.get_http_client", return_value=client),
+            patch("main.asyncio.sleep", new_callable=AsyncMock) as mock_sleep,
+        ):
+            await main.replicate_video_from_prompt(
+                "wan-video/wan-2.2-s2v",
+                "https://example.com/pet.jpg",
+                "Wave hello",
+                6,
+                "768p",
+                audio_url="https://example.com/audio.mp3",
+            )
+
+        delays = [call.args[0] for call in mock_sleep.await_args_list]
+        self.assertEqual(delays, [5.0, 1.5])
+
+    async def test_webhook_wakes_poll_loop_before_fallback_interval(self):
+        client = AsyncMock()
+        client.post.return_value = _response({"id": "pred-2"}, status_code=201)
+        polls = [
+            _response({"status": "processing"}),
+            _response({"status": "succeeded", "output": ["https://cdn/out.mp4"]}),
+        ]
+
+        async def get_prediction(_url):
+            response = polls.pop(0)
+            if polls:
+                # Deliver the completion webhook while the loop is waiting.
+                asyncio.get_running_loop().call_later(
+                    0.01,
+                    asyncio.ensure_future,
+                    main.replicate_webhook(
+                        main.ReplicateWebhookPayload(id="pred-2", status="succeeded")
+                    ),
+                )
+            return response
+
+        client.get.side_effect = get_prediction
+
+        with (
+            patch("main.REPLICATE_API_TOKEN", "token"),
+            patch("main.PUBLIC_CALLBACK_BASE", "https://backend.example"),
+            patch("main.REPLICATE_WEBHOOK_FALLBACK_POLL_SEC", 30.0),
+            patch("main.get_http_client", return_value=client),
+        ):
+            output = await asyncio.wait_for(
+                main.replicate_video_from_prompt(
+                    "wan-video/wan-2.2-s2v",
+                    "https://example.com/pet.jpg",
+                    "Wave hello",
+                    6,
+                    "768p",
+                    audio_url="https://example.com/audio.mp3",
+                ),
+                timeout=2,
+            )
+
+        self.assertEqual(output, "https://cdn/out.mp4")
+        create_body = orjson.loads(client.post.await_args.kwargs["content"])
+        self.assertEqual(
+            create_body["webhook"], "https://backend.example/webhooks/replicate"
+        )
+        self.assertEqual(create_body["webhook_events_filter"], ["completed"])
+        self.assertEqual(main._replicate_prediction_events, {})
+
+
+class ReplicateCoalescingTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        main._replicate_output_cache.clear()
+        main._replicate_inflight.clear()
+
+    def _client(self, release: asyncio.Event) -> AsyncMock:
+        client = AsyncMock()
+        client.post.return_value = _response({"id": "pred-4"}, status_code=201)
+
+        async def get_prediction(_url):
+            await release.wait()
+            return _response({"status": "succeeded", "output": "https://cdn/out.mp4"})
+
+        client.get.side_effect = get_prediction
+        return client
+
+    async def test_identical_concurrent_calls_share_one_prediction(self):
+        release = asyncio.Event()
+        client = self._client(release)
+
+        with (
+            patch("main.REPLICATE_API_TOKEN", "token"),
+            patch("main.get_http_client", return_value=client),
+        ):
+            calls = [
+                asyncio.ensure_future(
+                    main.replicate_video_from_prompt(
+                        *_PREDICTION_ARGS, audio_url="https://example.com/a.mp3"
+                    )
+                )
+                for _ in range(3)
+            ]
+            await asyncio.sleep(0)
+            release.set()
+            outputs = await asyncio.gather(*calls)
+
+        self.assertEqual(outputs, ["https://cdn/out.mp4"] * 3)
+        client.post.assert_awaited_once()
+        self.assertEqual(main._replicate_inflight, {})
+
+    async def test_cancelling_last_waiter_cancels_prediction(self):
+        client = self._client(asyncio.Event())
+
+        with (
+            patch("main.REPLICATE_API_TOKEN", "token"),
+            patch("main.get_http_client", return_value=client),
+        ):
+            call = asyncio.ensure_future(
+                main.replicate_video_from_prompt(
+                    *_PREDICTION_ARGS, audio_url="https://example.com/a.mp3"
+                )
+            )
+            await asyncio.sleep(0.01)
+            (inflight,) = main._replicate_inflight.values()
+            call.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await call
+            with self.assertRaises(asyncio.CancelledError):
+                await inflight.task
+
+        self.assertEqual(
+            client.post.await_args.args[0],
+            "https://api.replicate.com/v1/predictions/pred-4/cancel",
+        )
+
+    async def test_output_is_reused_within_cache_ttl(self):
+        release = asyncio.Event()
+        release.set()
+        client = self._client(release)
+
+        with (
+            patch("main.REPLICATE_API_TOKEN", "token"),
+            patch("main.REPLICATE_OUTPUT_CACHE_TTL_SEC", 600.0),
+            patch("main.get_http_client", return_value=client),
+        ):
+            first = await main.replicate_video_from_prompt(
+                *_PREDICTION_ARGS, audio_url="https://example.com/a.mp3"
+            )
+            second = await main.replicate_video_from_prompt(
+                *_PREDICTION_ARGS, audio_url="https://example.com/a.mp3"
+            )
+            await main.replicate_video_from_prompt(
+                *_PREDICTION_ARGS, audio_url="https://example.com/other.mp3"
+            )
+
+        self.assertEqual(first, second)
+        self.assertEqual(client.post.await_count, 2)
+
+    async def test_active_prediction_cap_defers_creating_extra_renders(self):
+        release = asyncio.Event()
+        client = self._client(release)
+
+        with (
+            patch("main.REPLICATE_API_TOKEN", "token"),
+            patch("main.REPLICATE_PREDICTION_SEM", asyncio.Semaphore(1)),
+            patch("main.get_http_client", return_value=client),
+        ):
+            calls = [
+                asyncio.ensure_future(
+                    main.replicate_video_from_prompt(
+                        *_PREDICTION_ARGS, audio_url=f"https://example.com/{name}.mp3"
+                    )
+                )
+                for name in ("a", "b")
+            ]
+            await asyncio.sleep(0.01)
+            self.assertEqual(client.post.await_count, 1)
+            release.set()
+            await asyncio.gather(*calls)
+
+        self.assertEqual(client.post.await_count, 2)
+
+
+class ReplicateWebhookSignatureTest(unittest.TestCase):
+    SECRET = "whsec_" + base64.b64encode(b"webhook-secret").decode()
+
+    def setUp(self):
+        self.client = TestClient(main.app)
+
+    def _signed_headers(self, body: bytes, timestamp: int | None = None) -> dict:
+        timestamp = int(time.time()) if timestamp is None else timestamp
+        signed = f"msg-1.{timestamp}.".encode() + body
+        signature = base64.b64encode(
+            hmac.new(b"webhook-secret", signed, hashlib.sha256).digest()
+        ).decode()
+        return {
+            "webhook-id": "msg-1",
+            "webhook-timestamp": str(timestamp),
+            "webhook-signature": f"v1,{signature}",
+            "content-type": "application/json",
+        }
+
+    def test_valid_signature_is_accepted(self):
+        body = b'{"id": "pred-5", "status": "succeeded"}'
+        with patch("main.REPLICATE_WEBHOOK_SECRET", self.SECRET):
+            response = self.client.post(
+                "/webhooks/replicate", content=body, headers=self._signed_headers(body)
+            )
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_tampered_or_stale_callbacks_are_rejected(self):
+        body = b'{"id": "pred-5", "status": "succeeded"}'
+        with patch("main.REPLICATE_WEBHOOK_SECRET", self.SECRET):
+            tampered = self.client.post(
+                "/webhooks/replicate",
+                content=body.replace(b"pred-5", b"pred-6"),
+                headers=self._signed_headers(body),
+            )
+            stale = self.client.post(
+                "/webhooks/replicate",
+                content=body,
+                headers=self._signed_headers(body, timestamp=int(time.time()) - 3600),
+            )
+            unsigned = self.client.post("/webhooks/replicate", content=body)
+
+        self.assertEqual(tampered.status_code, 401)
+        self.assertEqual(stale.status_code, 401)
+        self.assertEqual(unsigned.status_code, 401)
+
+
+if __name__ == "__main__":
+    unittest.main()
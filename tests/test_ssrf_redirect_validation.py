@@ -1,5 +1,5 @@
 import unittest
-from unittest.mock import Mock, patch
+from unittest.mock import AsyncMock, Mock, patch
 
 from fastapi import HTTPException
 
@@ -40,13 +40,7 @@ class _FetchClient:
     def __init__(self, responses):
         self._responses = iter(responses)
 
-    async def __aenter__(self):
-        return self
-
-    async def __aexit__(self, exc_type, exc, tb):
-        return False
-
-    def stream(self, method, url):
+    def stream(self, method, url, **kwargs):
         return next(self._responses)
 
 
@@ -59,26 +53,34 @@ class _HeadResponse:
         self.headers = headers or {}
         self.is_redirect = status_code in {301, 302, 303, 307, 308}
 
-
-class _HeadClient:
-    def __init__(self, head_responses, get_response):
-        self._head_responses = iter(head_responses)
-        self._get_response = get_response
-
     async def __aenter__(self):
         return self
 
     async def __aexit__(self, exc_type, exc, tb):
         return False
 
-    async def head(self, _url):
+    async def aread(self):
+        return b""
+
+
+class _HeadClient:
+    """Serves ``head_info`` probes via ``stream`` and range probes via ``get``."""
+
+    def __init__(self, head_responses, get_response):
+        self._head_responses = iter(head_responses)
+        self._get_response = get_response
+
+    def stream(self, method, _url, **kwargs):
         return next(self._head_responses)
 
-    async def get(self, _url, headers=None):
+    async def get(self, _url, headers=None, **kwargs):
         return self._get_response
 
 
 class RedirectValidationTests(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        main._head_info_cache.clear()
+
     async def test_fetch_binary_revalidates_redirect_targets(self):
         responses = [
             _StreamResponse(
@@ -97,7 +99,7 @@ class RedirectValidationTests(unittest.IsolatedAsyncioTestCase):
         validate.side_effect = validate_side_effect
 
         with patch("main._validate_outbound_url", validate), patch(
-            "main.httpx.AsyncClient", return_value=_FetchClient(responses)
+            "main.get_http_client", return_value=_FetchClient(responses)
         ):
             with self.assertRaises(HTTPException) as exc:
                 await main.fetch_binary("https://public.example/start")
@@ -129,7 +131,7 @@ class RedirectValidationTests(unittest.IsolatedAsyncioTestCase):
         validate.side_effect = validate_side_effect
 
         with patch("main._validate_outbound_url", validate), patch(
-            "main.httpx.AsyncClient",
+            "main.get_http_client",
             return_value=_HeadClient(
                 head_responses,
                 _HeadResponse(url="https://public.example/start", status_code=200),
@@ -148,6 +150,166 @@ class RedirectValidationTests(unittest.IsolatedAsyncioTestCase):
             ],
         )
 
+    async def test_delivery_debug_range_probe_revalidates_redirect_targets(self):
+        head_responses = [
+            _HeadResponse(
+                url="https://public.example/video.mp4",
+                status_code=200,
+                headers={"content-type": "video/mp4", "content-length": "2048"},
+            ),
+        ]
+        range_redirect = _HeadResponse(
+            url="https://public.example/video.mp4",
+            status_code=302,
+            headers={"location": "http://10.0.0.5/video.mp4"},
+        )
+        validate = Mock()
+
+        def validate_side_effect(url, *, allow_private=False):
+            if "10.0.0.5" in url:
+                raise HTTPException(400, "URL host is not publicly routable.")
+
+        validate.side_effect = validate_side_effect
+
+        with patch("main._validate_outbound_url", validate), patch(
+            "main.get_http_client",
+            return_value=_HeadClient(head_responses, range_redirect),
+        ):
+            with self.assertRaises(HTTPException) as exc:
+                await main.collect_video_delivery_debug(
+                    "https://public.example/video.mp4"
+                )
+
+        self.assertEqual(exc.exception.status_code, 400)
+        called_urls = [call.args[0] for call in validate.call_args_list]
+        self.assertIn("http://10.0.0.5/video.mp4", called_urls)
+
+    async def test_job_rejects_private_image_url_while_model_resolves(self):
+        req = main.JobPromptOnly(
+            image_url="http://127.0.0.1/pet.jpg",
+            prompt="Say hi",
+        )
+
+        with patch("main._resolve_job_model", new_callable=AsyncMock) as mock_resolve:
+            mock_resolve.return_value = ("model", {}, {}, "free")
+            with self.assertRaises(HTTPException) as exc:
+                await main.process_prompt_only_request(req)
+
+        self.assertEqual(exc.exception.status_code, 400)
+        self.assertEqual(exc.exception.detail, "URL host is not publicly routable.")
+
+
+class HeadInfoTests(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        main._head_info_cache.clear()
+
+    def tearDown(self):
+        main._head_info_cache.clear()
+
+    async def test_successful_head_results_are_cached(self):
+        client = _HeadClient(
+            [
+                _HeadResponse(
+                    url="https://public.example/pet.jpg",
+                    status_code=206,
+                    headers={
+                        "content-type": "image/jpeg",
+                        "content-length": "1",
+                        "content-range": "bytes 0-0/42",
+                    },
+                )
+            ],
+            None,
+        )
+
+        with patch("main._validate_outbound_url"), patch(
+            "main.get_http_client", return_value=client
+        ):
+            first = await main.head_info("https://public.example/pet.jpg")
+            second = await main.head_info("https://public.example/pet.jpg")
+
+        # The fake has a single probe response, so a second origin hit would fail.
+        self.assertEqual(first, (200, "image/jpeg", 42))
+        self.assertEqual(second, first)
+
+    async def test_error_head_results_are_not_cached(self):
+        not_found = _HeadResponse(url="https://public.example/gone", status_code=404)
+        client = _HeadClient([not_found, not_found], not_found)
+
+        with patch("main._validate_outbound_url"), patch(
+            "main.get_http_client", return_value=client
+        ):
+            await main.head_info("https://public.example/gone")
+            status, _, _ = await main.head_info("https://public.example/gone")
+
+        self.assertEqual(status, 404)
+        self.assertNotIn("https://public.example/gone", main._head_info_cache)
+
+    async def test_empty_object_falls_back_to_unranged_get(self):
+        client = _HeadClient(
+            [
+                _HeadResponse(url="https://public.example/empty", status_code=416),
+                _HeadResponse(
+                    url="https://public.example/empty",
+                    status_code=200,
+                    headers={"content-type": "audio/mpeg", "content-length": "0"},
+                ),
+            ],
+            None,
+        )
+
+        with patch("main._validate_outbound_url"), patch(
+            "main.get_http_client", return_value=client
+        ):
+            result = await main.head_info("https://public.example/empty")
+
+        self.assertEqual(result, (200, "audio/mpeg", 0))
+
+    async def test_range_ignoring_origin_reports_content_length(self):
+        client = _HeadClient(
+            [
+                _HeadResponse(
+                    url="https://public.example/pet.mp4",
+                    status_code=200,
+                    headers={"content-type": "video/mp4", "content-length": "4096"},
+                )
+            ],
+            None,
+        )
+
+        with patch("main._validate_outbound_url"), patch(
+            "main.get_http_client", return_value=client
+        ):
+            result = await main.head_info("https://public.example/pet.mp4")
+
+        self.assertEqual(result, (200, "video/mp4", 4096))
+
+    async def test_expired_entry_is_revalidated_with_etag(self):
+        url = "https://public.example/pet.jpg"
+        main._head_info_cache[url] = (0.0, (200, "image/jpeg", 42), '"v1"')
+        sent_headers = []
+
+        class _RecordingClient(_HeadClient):
+            def stream(self, method, _url, **kwargs):
+                sent_headers.append(kwargs.get("headers", {}))
+                return super().stream(method, _url, **kwargs)
+
+        client = _RecordingClient(
+            [_HeadResponse(url=url, status_code=304, headers={"etag": '"v1"'})],
+            None,
+        )
+
+        with patch("main._validate_outbound_url"), patch(
+            "main.get_http_client", return_value=client
+        ):
+            result = await main.head_info(url)
+
+        self.assertEqual(result, (200, "image/jpeg", 42))
+        self.assertEqual(sent_headers[0]["If-None-Match"], '"v1"')
+        expires_at, _, etag = main._head_info_cache[url]
+        self.assertGreater(expires_at, 0.0)
+        self.assertEqual(etag, '"v1"')
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -2,7 +2,12 @@ import unittest
 
 from fastapi import HTTPException
 
-from main import UserContext, resolve_user_storage_prefix, build_storage_key
+from main import (
+    UserContext,
+    build_storage_key,
+    build_tts_cache_key,
+    resolve_user_storage_prefix,
+)
 
 
 class StorageHelpersTestCase(unittest.TestCase):
@@ -15,11 +20,20 @@ class StorageHelpersTestCase(unittest.TestCase):
             resolve_user_storage_prefix(context),
             "users/00000000-0000-0000-0000-000000000000",
         )
+        upper = UserContext(id="ABCDEF00-0000-0000-0000-000000000000")
+        self.assertEqual(
+            resolve_user_storage_prefix(upper),
+            "users/abcdef00-0000-0000-0000-000000000000",
+        )
 
     def test_invalid_uuid_raises_http_exception(self):
         with self.assertRaises(HTTPException) as exc:
             resolve_user_storage_prefix(UserContext(id="not-a-uuid"))
         self.assertEqual(exc.exception.status_code, 400)
+        with self.assertRaises(HTTPException):
+            resolve_user_storage_prefix(
+                UserContext(id="00000000-0000-0000-0000-000000000000/../x")
+            )
 
     def test_build_storage_key_scopes_to_prefix(self):
         key = build_storage_key(
@@ -29,6 +43,17 @@ class StorageHelpersTestCase(unittest.TestCase):
             key.startswith("users/00000000-0000-0000-0000-000000000000/videos/")
         )
         self.assertTrue(key.endswith(".mp4"))
+        token = key.rsplit("/", 1)[1].removesuffix(".mp4")
+        self.assertRegex(token, r"^[A-Za-z0-9_-]{16}$")
+
+    def test_tts_cache_key_is_deterministic_per_script_and_voice(self):
+        prefix = "users/00000000-0000-0000-0000-000000000000"
+        key = build_tts_cache_key(prefix, "Hello!", "voice-1")
+
+        self.assertEqual(key, build_tts_cache_key(prefix, "Hello!", "voice-1"))
+        self.assertNotEqual(key, build_tts_cache_key(prefix, "Hello!", "voice-2"))
+        self.assertNotEqual(key, build_tts_cache_key(prefix, "Hello?", "voice-1"))
+        self.assertRegex(key, rf"^{prefix}/tts-cache/[0-9a-f]{{32}}\.mp3$")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,136 @@
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, patch
+
+import httpx
+
+import main
+
+
+class _FakeTusServer:
+    """Minimal Storage TUS endpoint that drops the first attempt at part two."""
+
+    def __init__(self):
+        self.received = bytearray()
+        self.requests: list[tuple[str, str]] = []
+        self._dropped = False
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append((request.method, request.url.path))
+        if request.method == "POST":
+            return httpx.Response(
+                201, headers={"Location": "/storage/v1/upload/resumable/up-1"}
+            )
+        if request.method == "HEAD":
+            return httpx.Response(
+                200, headers={"Upload-Offset": str(len(self.received))}
+            )
+        body = await request.aread()
+        if len(self.received) and not self._dropped:
+            self._dropped = True
+            return httpx.Response(503)
+        if int(request.headers["Upload-Offset"]) != len(self.received):
+            return httpx.Response(409)
+        self.received += body
+        return httpx.Response(204, headers={"Upload-Offset": str(len(self.received))})
+
+
+class SupabaseResumableUploadTest(unittest.IsolatedAsyncioTestCase):
+    async def test_large_upload_resumes_after_failed_part(self):
+        server = _FakeTusServer()
+        client = httpx.AsyncClient(transport=httpx.MockTransport(server))
+        data = bytearray(b"abcdefghij" * 3)
+
+        with (
+            patch("main.SUPABASE_URL", "https://supabase.test"),
+            patch("main.SUPABASE_SERVICE_ROLE", "service-role"),
+            patch("main.PUBLIC_BASE", "https://supabase.test/storage/v1/object/public"),
+            patch("main.SUPABASE_RESUMABLE_THRESHOLD_BYTES", 16),
+            patch("main.SUPABASE_TUS_CHUNK_BYTES", 12),
+            patch("main.get_http_client", return_value=client),
+            patch("main.asyncio.sleep", new_callable=AsyncMock),
+        ):
+            url = await main.supabase_upload(data, "videos/final.mp4", "video/mp4")
+
+        self.assertEqual(bytes(server.received), bytes(data))
+        self.assertEqual(
+            url, "https://supabase.test/storage/v1/object/public/pets/videos/final.mp4"
+        )
+        self.assertEqual(
+            [method for method, _ in server.requests],
+            ["POST", "PATCH", "PATCH", "HEAD", "PATCH", "PATCH"],
+        )
+
+    async def _upload(self, handler) -> None:
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        with (
+            patch("main.SUPABASE_URL", "https://supabase.test"),
+            patch("main.SUPABASE_SERVICE_ROLE", "service-role"),
+            patch("main.SUPABASE_RESUMABLE_THRESHOLD_BYTES", 16),
+            patch("main.SUPABASE_TUS_CHUNK_BYTES", 12),
+            patch("main.get_http_client", return_value=client),
+            patch("main.asyncio.sleep", new_callable=AsyncMock),
+        ):
+            await main.supabase_upload(
+                bytearray(b"abcdefghij" * 3), "videos/final.mp4", "video/mp4"
+            )
+
+    async def test_failed_offset_resync_ends_in_502(self):
+        async def handler(request: httpx.Request) -> httpx.Response:
+            if request.method == "POST":
+                return httpx.Response(
+                    201, headers={"Location": "/storage/v1/upload/resumable/up-1"}
+                )
+            if request.method == "HEAD":
+                raise httpx.ConnectError("resync failed", request=request)
+            return httpx.Response(503)
+
+        with self.assertRaises(main.HTTPException) as exc:
+            await self._upload(handler)
+
+        self.assertEqual(exc.exception.status_code, 502)
+
+    async def test_create_without_location_is_rejected(self):
+        requests: list[str] = []
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(request.method)
+            return httpx.Response(201)
+
+        with self.assertRaises(main.HTTPException) as exc:
+            await self._upload(handler)
+
+        self.assertEqual(exc.exception.status_code, 502)
+        self.assertEqual(requests, ["POST"])
+
+
+class SupabaseConcurrencyTest(unittest.IsolatedAsyncioTestCase):
+    async def test_semaphore_bounds_in_flight_requests(self):
+        in_flight = 0
+        peak = 0
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return httpx.Response(204)
+
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        with (
+            patch("main.SUPABASE_URL", "https://supabase.test"),
+            patch("main.SUPABASE_SERVICE_ROLE", "service-role"),
+            patch("main.UPLOAD_BASE", "https://supabase.test/storage/v1/object"),
+            patch("main.SUPABASE_SEM", asyncio.Semaphore(2)),
+            patch("main.get_http_client", return_value=client),
+        ):
+            await asyncio.gather(
+                *(main.supabase_delete(f"videos/{index}.mp4") for index in range(6))
+            )
+
+        self.assertEqual(peak, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
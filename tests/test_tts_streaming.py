@@ -0,0 +1,126 @@
+import asyncio
+import unittest
+from unittest.mock import patch
+
+import httpx
+from fastapi import HTTPException
+
+import main
+
+
+class TtsStreamingUploadTest(unittest.IsolatedAsyncioTestCase):
+    def _clients(self, uploaded: list[bytes]):
+        async def eleven_handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(200, content=b"ID3" + b"a" * 2048)
+
+        async def supabase_handler(request: httpx.Request) -> httpx.Response:
+            uploaded.append(await request.aread())
+            return httpx.Response(200, json={"Key": "pets/audio.mp3"})
+
+        return {
+            "elevenlabs": httpx.AsyncClient(
+                transport=httpx.MockTransport(eleven_handler)
+            ),
+            "supabase": httpx.AsyncClient(
+                transport=httpx.MockTransport(supabase_handler)
+            ),
+        }
+
+    async def test_tts_chunks_stream_into_supabase_upload(self):
+        uploaded: list[bytes] = []
+        clients = self._clients(uploaded)
+
+        with (
+            patch("main.ELEVEN_API_KEY", "eleven-key"),
+            patch("main.SUPABASE_URL", "https://supabase.test"),
+            patch("main.SUPABASE_SERVICE_ROLE", "service-role"),
+            patch("main.UPLOAD_BASE", "https://supabase.test/storage/v1/object"),
+            patch("main.PUBLIC_BASE", "https://supabase.test/storage/v1/object/public"),
+            patch("main.get_http_client", side_effect=clients.__getitem__),
+        ):
+            async with main.elevenlabs_tts_stream("Hello!", "voice-1") as chunks:
+                url = await main.supabase_upload(chunks, "audio.mp3", "audio/mpeg")
+
+        self.assertEqual(uploaded, [b"ID3" + b"a" * 2048])
+        self.assertEqual(
+            url, "https://supabase.test/storage/v1/object/public/pets/audio.mp3"
+        )
+
+    async def test_buffered_tts_audio_uploads_without_copy(self):
+        uploaded: list[bytes] = []
+        clients = self._clients(uploaded)
+
+        with (
+            patch("main.ELEVEN_API_KEY", "eleven-key"),
+            patch("main.SUPABASE_URL", "https://supabase.test"),
+            patch("main.SUPABASE_SERVICE_ROLE", "service-role"),
+            patch("main.UPLOAD_BASE", "https://supabase.test/storage/v1/object"),
+            patch("main.get_http_client", side_effect=clients.__getitem__),
+        ):
+            audio = await main.elevenlabs_tts_bytes("Hello!", "voice-1")
+            await main.supabase_upload(memoryview(audio), "audio.mp3", "audio/mpeg")
+
+        self.assertIsInstance(audio, bytearray)
+        self.assertEqual(uploaded, [b"ID3" + b"a" * 2048])
+
+    async def test_oversized_tts_stream_is_rejected(self):
+        uploaded: list[bytes] = []
+        clients = self._clients(uploaded)
+
+        with (
+            patch("main.ELEVEN_API_KEY", "eleven-key"),
+            patch("main.TTS_MAX_AUDIO_BYTES", 1024),
+            patch("main.get_http_client", side_effect=clients.__getitem__),
+        ):
+            with self.assertRaises(HTTPException) as exc:
+                await main.elevenlabs_tts_bytes("Hello!", "voice-1")
+
+        self.assertEqual(exc.exception.status_code, 400)
+
+    async def test_declared_oversize_audio_is_rejected_before_upload(self):
+        uploaded: list[bytes] = []
+        clients = self._clients(uploaded)
+
+        with (
+            patch("main.ELEVEN_API_KEY", "eleven-key"),
+            patch("main.SUPABASE_URL", "https://supabase.test"),
+            patch("main.SUPABASE_SERVICE_ROLE", "service-role"),
+            patch("main.UPLOAD_BASE", "https://supabase.test/storage/v1/object"),
+            patch("main.TTS_MAX_AUDIO_BYTES", 1024),
+            patch("main.get_http_client", side_effect=clients.__getitem__),
+        ):
+            with self.assertRaises(HTTPException) as exc:
+                async with main.elevenlabs_tts_stream("Hello!", "voice-1") as chunks:
+                    await main.supabase_upload(chunks, "audio.mp3", "audio/mpeg")
+
+        self.assertEqual(exc.exception.status_code, 400)
+        self.assertEqual(uploaded, [])
+
+
+class ValidateTtsTextTest(unittest.TestCase):
+    def test_default_limits_accept_max_length_script(self):
+        main.validate_tts_text("a" * main.TTS_MAX_CHARS)
+
+    def test_rejects_script_too_long(self):
+        with self.assertRaises(HTTPException) as exc:
+            main.validate_tts_text("a" * (main.TTS_MAX_CHARS + 1))
+
+        self.assertEqual(exc.exception.status_code, 400)
+
+    def test_prompt_tts_request_is_rejected_before_model_resolution(self):
+        req = main.JobPromptTTS(
+            image_url="https://example.com/pet.jpg",
+            prompt="Say hi",
+            text="a" * (main.TTS_MAX_CHARS + 1),
+            voice_id="voice-1",
+        )
+
+        with patch("main._resolve_job_model_checking_image_url") as mock_resolve:
+            with self.assertRaises(HTTPException):
+                asyncio.run(main.process_prompt_tts_request(req))
+
+        mock_resolve.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, patch
+
+import httpx
+
+import main
+
+
+class SendWithRetryTest(unittest.IsolatedAsyncioTestCase):
+    async def test_retries_429_honouring_retry_after(self):
+        statuses = [429, 503, 200]
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            status = statuses.pop(0)
+            headers = {"Retry-After": "7"} if status == 429 else {}
+            return httpx.Response(status, headers=headers)
+
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            with patch("main.asyncio.sleep", new_callable=AsyncMock) as mock_sleep:
+                response = await main.send_with_retry(
+                    lambda: client.get("https://api.replicate.com/v1/predictions/p")
+                )
+
+        self.assertEqual(response.status_code, 200)
+        delays = [call.args[0] for call in mock_sleep.await_args_list]
+        self.assertEqual(delays, [7.0, 2.0])
+
+    async def test_returns_last_response_when_attempts_exhausted(self):
+        calls = 0
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            nonlocal calls
+            calls += 1
+            return httpx.Response(502)
+
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            with (
+                patch("main.UPSTREAM_RETRY_ATTEMPTS", 2),
+                patch("main.asyncio.sleep", new_callable=AsyncMock),
+            ):
+                response = await main.send_with_retry(
+                    lambda: client.get("https://api.replicate.com/v1/predictions/p")
+                )
+
+        self.assertEqual(response.status_code, 502)
+        self.assertEqual(calls, 2)
+
+    async def test_client_errors_are_not_retried(self):
+        send = AsyncMock(return_value=httpx.Response(422))
+
+        response = await main.send_with_retry(send)
+
+        self.assertEqual(response.status_code, 422)
+        send.assert_awaited_once()
+
+    async def test_non_idempotent_requests_do_not_retry_ambiguous_5xx(self):
+        for status in (500, 502, 503, 504):
+            with self.subTest(status=status):
+                send = AsyncMock(return_value=httpx.Response(status))
+
+                response = await main.send_with_retry(send, idempotent=False)
+
+                self.assertEqual(response.status_code, status)
+                send.assert_awaited_once()
+
+    async def test_non_idempotent_requests_retry_explicit_backoff(self):
+        send = AsyncMock(
+            side_effect=[
+                httpx.Response(429),
+                httpx.Response(503, headers={"Retry-After": "1"}),
+                httpx.Response(201),
+            ]
+        )
+
+        with patch("main.asyncio.sleep", new_callable=AsyncMock):
+            response = await main.send_with_retry(send, idempotent=False)
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(send.await_count, 3)
+
+    async def test_semaphore_bounds_in_flight_requests(self):
+        in_flight = 0
+        peak = 0
+
+        async def send():
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return httpx.Response(200)
+
+        semaphore = asyncio.Semaphore(2)
+        await asyncio.gather(*(main.send_with_retry(send, semaphore) for _ in range(6)))
+
+        self.assertEqual(peak, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,9 +1,11 @@
 import asyncio
+import os
 import subprocess
 import unittest
 from types import SimpleNamespace
-from unittest.mock import patch
+from unittest.mock import AsyncMock, patch
 
+import httpx
 from fastapi import HTTPException
 
 import main
@@ -91,6 +93,21 @@ class CompressVideoBytesFallbackTest(unittest.TestCase):
             with self.assertRaises(subprocess.CalledProcessError):
                 main._compress_video_bytes(b"video-bytes", 28)
 
+    def test_scratch_dir_honours_media_tmp_dir(self):
+        with (
+            patch("main.MEDIA_TMP_DIR", "/dev/shm"),
+            patch("main.get_ffmpeg_path", return_value="/usr/bin/ffmpeg"),
+            patch(
+                "main.tempfile.mkdtemp", return_value="/dev/shm/compress-test"
+            ) as mock_mkdtemp,
+            patch("main.shutil.rmtree"),
+            patch("builtins.open", unittest.mock.mock_open(read_data=b"compressed")),
+            patch("main.subprocess.run"),
+        ):
+            main._compress_video_bytes(b"video-bytes", 28)
+
+        mock_mkdtemp.assert_called_once_with(dir="/dev/shm")
+
 
 class GetFfmpegPathTest(unittest.TestCase):
     def setUp(self):
@@ -216,39 +233,102 @@ class FfmpegSmokeCheckTest(unittest.TestCase):
         self.assertTrue(isinstance(ffmpeg_path, str) and len(ffmpeg_path) > 0)
 
 
+class _FakeProcess:
+    def __init__(self, returncode: int = 0, stderr: bytes = b""):
+        self.returncode = returncode
+        self._stderr = stderr
+        self.stdin_data = None
+
+    async def communicate(self, input=None):
+        self.stdin_data = input
+        return None, self._stderr
+
+
 class MuxVideoAudioTest(unittest.TestCase):
-    class _FakeResponse:
-        def __init__(self, content: bytes):
-            self.content = content
+    @staticmethod
+    def _fake_client() -> httpx.AsyncClient:
+        async def handler(request: httpx.Request) -> httpx.Response:
+            if request.url.path.endswith(".mp3"):
+                return httpx.Response(200, content=b"audio-bytes")
+            return httpx.Response(200, content=b"video-bytes")
+
+        return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    def test_mux_downloads_both_inputs_before_running_ffmpeg(self):
+        inputs = {}
+
+        async def fake_exec(*cmd, **kwargs):
+            for path in [cmd[i + 1] for i, arg in enumerate(cmd) if arg == "-i"]:
+                with open(path, "rb") as f:
+                    inputs[os.path.basename(path)] = f.read()
+            with open(cmd[-1], "wb") as f:
+                f.write(b"muxed")
+            return _FakeProcess()
+
+        async def run_test():
+            with (
+                patch("main.get_http_client", return_value=self._fake_client()),
+                patch("main.get_ffmpeg_path", return_value="/usr/bin/ffmpeg"),
+                patch("main.asyncio.create_subprocess_exec", side_effect=fake_exec),
+            ):
+                return await main.mux_video_audio(
+                    "https://example.com/video.mp4", "https://example.com/audio.mp3"
+                )
+
+        self.assertEqual(asyncio.run(run_test()), b"muxed")
+        self.assertEqual(inputs, {"in.mp4": b"video-bytes", "in.mp3": b"audio-bytes"})
+
+    def test_mux_uses_in_memory_audio_without_downloading_it(self):
+        requested = []
+        inputs = {}
 
-        def raise_for_status(self):
-            return None
+        async def handler(request: httpx.Request) -> httpx.Response:
+            requested.append(request.url.path)
+            return httpx.Response(200, content=b"video-bytes")
 
-    class _FakeAsyncClient:
-        async def __aenter__(self):
-            return self
+        process = _FakeProcess()
 
-        async def __aexit__(self, exc_type, exc, tb):
-            return False
+        async def fake_exec(*cmd, **kwargs):
+            inputs["args"] = [cmd[i + 1] for i, arg in enumerate(cmd) if arg == "-i"]
+            inputs["stdin"] = kwargs["stdin"]
+            with open(inputs["args"][0], "rb") as f:
+                inputs["video"] = f.read()
+            with open(cmd[-1], "wb") as f:
+                f.write(b"muxed")
+            return process
 
-        async def get(self, url: str):
-            if url.endswith(".mp3"):
-                return MuxVideoAudioTest._FakeResponse(b"audio-bytes")
-            return MuxVideoAudioTest._FakeResponse(b"video-bytes")
+        audio = bytearray(b"tts-audio")
+
+        async def run_test():
+            client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+            with (
+                patch("main.get_http_client", return_value=client),
+                patch("main.get_ffmpeg_path", return_value="/usr/bin/ffmpeg"),
+                patch("main.asyncio.create_subprocess_exec", side_effect=fake_exec),
+            ):
+                return await main.mux_video_audio(
+                    "https://example.com/video.mp4", audio
+                )
+
+        self.assertEqual(asyncio.run(run_test()), b"muxed")
+        self.assertEqual(requested, ["/video.mp4"])
+        self.assertEqual(inputs["args"][1], "pipe:0")
+        self.assertEqual(inputs["stdin"], asyncio.subprocess.PIPE)
+        self.assertEqual(inputs["video"], b"video-bytes")
+        # Handed to ffmpeg as-is, without copying the teed buffer.
+        self.assertIs(process.stdin_data, audio)
 
     def test_mux_maps_called_process_error_to_http_500(self):
         async def run_test():
             with (
-                patch("main.httpx.AsyncClient", return_value=self._FakeAsyncClient()),
+                patch("main.get_http_client", return_value=self._fake_client()),
                 patch("main.get_ffmpeg_path", return_value="/usr/bin/ffmpeg"),
                 patch(
-                    "main.subprocess.run",
-                    side_effect=subprocess.CalledProcessError(
-                        1,
-                        ["/usr/bin/ffmpeg"],
-                        stderr="mux failed",
-                    ),
+                    "main.asyncio.create_subprocess_exec",
+                    new_callable=AsyncMock,
+                    return_value=_FakeProcess(returncode=1, stderr=b"mux failed"),
                 ),
+                patch("main.logger.error") as mock_error,
             ):
                 with self.assertRaises(HTTPException) as exc:
                     await main.mux_video_audio(
@@ -257,13 +337,14 @@ class MuxVideoAudioTest(unittest.TestCase):
 
             self.assertEqual(exc.exception.status_code, 500)
             self.assertEqual(exc.exception.detail, "ffmpeg mux failed")
+            self.assertIn("mux failed", mock_error.call_args.args[1])
 
         asyncio.run(run_test())
 
     def test_mux_maps_missing_ffmpeg_to_http_500(self):
         async def run_test():
             with (
-                patch("main.httpx.AsyncClient", return_value=self._FakeAsyncClient()),
+                patch("main.get_http_client", return_value=self._fake_client()),
                 patch("main.get_ffmpeg_path", side_effect=FileNotFoundError("missing")),
             ):
                 with self.assertRaises(HTTPException) as exc: